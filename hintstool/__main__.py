@@ -0,0 +1,3 @@
+from hintstool.gui import main
+
+main()
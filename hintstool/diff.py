@@ -0,0 +1,260 @@
+import argparse
+from collections import Counter
+from enum import Enum
+
+from hintstool.gui import EntryType, YAMLParser, open_hints_file
+
+"""
+    Structural comparison of two hint files.
+    Entries are matched by their item ID instead of their position in the
+    file, so re-sorted files produce no differences. Both files are read
+    item by item. Files sorted by item ID, like all files saved by the tool,
+    are merged without keeping their entries in memory. Otherwise the
+    entries of the old file are kept in memory.
+"""
+
+
+class NotSortedError(ValueError):
+    pass
+
+
+class ChangeType(Enum):
+    ADDED = "added"
+    REMOVED = "removed"
+    MODIFIED = "modified"
+    RELINKED = "relinked"
+    REORDERED = "reordered"
+
+
+class Change:
+    """
+    A single difference between two hint files.
+    Modified entries have a new ID or content, relinked entries have other
+    following entries and reordered entries have the same following entries
+    in a different order.
+    """
+
+    def __init__(self, change_type, item_id, old=None, new=None):
+        self.change_type = change_type
+        self.item_id = item_id
+        self.old = old
+        self.new = new
+
+    def __str__(self):
+        if self.change_type == ChangeType.ADDED:
+            return "+ {} ({} {})".format(self.item_id,
+                                         self.new.get_entry_type().name.lower(),
+                                         self.new.entry_id)
+        if self.change_type == ChangeType.REMOVED:
+            return "- {} ({} {})".format(self.item_id,
+                                         self.old.get_entry_type().name.lower(),
+                                         self.old.entry_id)
+        if self.change_type == ChangeType.MODIFIED:
+            changed = []
+            if self.old.entry_id != self.new.entry_id:
+                changed.append("id {} -> {}".format(self.old.entry_id,
+                                                    self.new.entry_id))
+            if self.old.content != self.new.content:
+                changed.append("content")
+            return "~ {} {}".format(self.item_id, ", ".join(changed))
+        return "> {} {} {} -> {}".format(self.item_id, self.change_type.value,
+                                         self.old.next_entries,
+                                         self.new.next_entries)
+
+
+def iter_entries(path):
+    """
+    Reads the entries of a hints file one at a time.
+
+    :param path: Path to the hints file
+    :return: Generator of entries
+    """
+    with open_hints_file(path) as stream:
+        for item_id, item in YAMLParser.iter_items(stream):
+            entry = YAMLParser.create_entry_from_yaml(item_id, item)
+            if entry is not None:
+                yield entry
+
+
+def diff(old_path, new_path):
+    """
+    Compares two hint files.
+
+    :param old_path: Path to the original file
+    :param new_path: Path to the changed file
+    :return: List of changes
+    """
+    try:
+        return merge_entries(iter_entries(old_path), iter_entries(new_path))
+    except NotSortedError:
+        return diff_entries(iter_entries(old_path), iter_entries(new_path))
+
+
+def diff_entries(old_entries, new_entries):
+    """
+    Compares two collections of entries by their item IDs in linear time.
+    Changes are reported in the order of new_entries, followed by the
+    removed entries.
+
+    :param old_entries: Iterable of the original entries
+    :param new_entries: Iterable of the changed entries
+    :return: List of changes
+    """
+    old_items = {entry.item_id: entry for entry in old_entries}
+    changes = []
+    for new in new_entries:
+        changes += compare_entries(old_items.pop(new.item_id, None), new)
+    for old in old_items.values():
+        changes.append(Change(ChangeType.REMOVED, old.item_id, old=old))
+    return changes
+
+
+def merge_entries(old_entries, new_entries):
+    """
+    Compares two collections of entries sorted by their item IDs by merging
+    them, so only the changed entries are kept in memory.
+    Changes are reported in the order of the item IDs.
+
+    :param old_entries: Iterable of the original entries
+    :param new_entries: Iterable of the changed entries
+    :return: List of changes
+    :raises NotSortedError: If the entries are not sorted by their item IDs
+    """
+    old_entries = _check_sorted(old_entries)
+    new_entries = _check_sorted(new_entries)
+    old, new = next(old_entries, None), next(new_entries, None)
+    changes = []
+    while old is not None or new is not None:
+        if new is None or (old is not None and old.item_id < new.item_id):
+            changes += compare_entries(old, None)
+            old = next(old_entries, None)
+        elif old is None or new.item_id < old.item_id:
+            changes += compare_entries(None, new)
+            new = next(new_entries, None)
+        else:
+            changes += compare_entries(old, new)
+            old, new = next(old_entries, None), next(new_entries, None)
+    return changes
+
+
+def compare_entries(old, new):
+    """
+    Compares two versions of the entry with the same item ID.
+
+    :param old: Original entry or None if it has been added
+    :param new: Changed entry or None if it has been removed
+    :return: List of changes
+    """
+    if new is None:
+        return [Change(ChangeType.REMOVED, old.item_id, old=old)]
+    if old is None or old.get_entry_type() != new.get_entry_type():
+        changes = [] if old is None else [
+            Change(ChangeType.REMOVED, old.item_id, old=old)]
+        return changes + [Change(ChangeType.ADDED, new.item_id, new=new)]
+    changes = []
+    if old.entry_id != new.entry_id or old.content != new.content:
+        changes.append(Change(ChangeType.MODIFIED, new.item_id, old, new))
+    if old.next_entries != new.next_entries:
+        if Counter(old.next_entries) == Counter(new.next_entries):
+            change_type = ChangeType.REORDERED
+        else:
+            change_type = ChangeType.RELINKED
+        changes.append(Change(change_type, new.item_id, old, new))
+    return changes
+
+
+def _check_sorted(entries):
+    previous = None
+    for entry in entries:
+        if previous is not None and entry.item_id <= previous:
+            raise NotSortedError(entry.item_id)
+        previous = entry.item_id
+        yield entry
+
+
+def patch(state, changes):
+    """
+    Applies changes created by diff to a state.
+    References to removed entries are kept, just like in the changed file.
+
+    :param state: State to change
+    :param changes: List of changes
+    """
+    # Entries are changed directly, so the changes are made under one lock
+    with state.writing():
+        _patch(state, changes)
+
+
+def _patch(state, changes):
+    items = {entry.item_id: entry for manager in state.entries.values() for
+             entry in manager.entry_mapping.values()}
+
+    def find(change):
+        if change.item_id not in items:
+            raise ValueError(change.item_id)
+        return items[change.item_id]
+
+    # All entries are looked up before the state is changed, so a patch
+    # which does not fit is rejected without changing anything
+    targets = [(change, find(change)) for change in changes if
+               change.change_type != ChangeType.ADDED]
+    removed = [entry for change, entry in targets if
+               change.change_type == ChangeType.REMOVED]
+    added = [change.new.__class__(change.new.item_id, change.new.entry_id,
+                                  change.new.next_entries, change.new.content)
+             for change in changes if change.change_type == ChangeType.ADDED]
+    renames = {EntryType.QUESTION: {}, EntryType.ANSWER: {}}
+    for change, entry in targets:
+        if change.change_type == ChangeType.MODIFIED and \
+                entry.entry_id != change.new.entry_id:
+            renames[entry.get_entry_type()][entry.entry_id] = \
+                change.new.entry_id
+    _check_ids(state, removed, renames, added)
+
+    # IDs can move between entries, so all renames are applied together and
+    # before adding entries, which might use the previous IDs
+    state.discard_entries(removed)
+    for entry_type, type_renames in renames.items():
+        state.rename_entries(entry_type, type_renames)
+    for change, entry in targets:
+        if change.change_type == ChangeType.MODIFIED:
+            state.update_content(change.new.content, entry)
+        elif change.change_type in (ChangeType.RELINKED,
+                                    ChangeType.REORDERED):
+            entry.next_entries = list(change.new.next_entries)
+    state.add_loaded_entries(added)
+    state.graph.clear()
+
+
+def _check_ids(state, removed, renames, added):
+    """
+    Raises a ValueError if the patched state would contain an entry ID of a
+    type or an item ID more than once. The state is not changed then.
+    """
+    removed = set(map(id, removed))
+    item_ids = Counter(entry.item_id for entry in added)
+    for entry_type, manager in state.entries.items():
+        entry_ids = Counter(entry.entry_id for entry in added if
+                            entry.get_entry_type() == entry_type)
+        for entry_id, entry in manager.entry_mapping.items():
+            if id(entry) not in removed:
+                entry_ids[renames[entry_type].get(entry_id, entry_id)] += 1
+                item_ids[entry.item_id] += 1
+        duplicates = [entry_id for entry_id, count in entry_ids.items() if
+                      count > 1]
+        if len(duplicates) > 0:
+            raise ValueError("Duplicate IDs {}".format(sorted(duplicates)))
+    duplicates = [item_id for item_id, count in item_ids.items() if count > 1]
+    if len(duplicates) > 0:
+        raise ValueError("Duplicate item IDs {}".format(sorted(duplicates)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare two hint files by their item IDs")
+    parser.add_argument("old", type=str, help="Path to the original file")
+    parser.add_argument("new", type=str, help="Path to the changed file")
+    args = parser.parse_args()
+
+    for change in diff(args.old, args.new):
+        print(change)
@@ -0,0 +1,202 @@
+import argparse
+import json
+import re
+import struct
+import sys
+from array import array
+
+from pathlib2 import Path
+
+from hintstool.gui import EntryType, State
+
+"""
+    Compiles the hints of a state into a compact runtime format for the
+    learning platform, which only follows the hints from questions to answers
+    and back to questions.
+
+    Entries are numbered, questions first. Every ID and content is stored once
+    in a string table and referenced by its index. The following entries are
+    stored in CSR format: the following entries of entry i are
+    targets[offsets[i]:offsets[i + 1]]. A target >= 0 is the index of an entry,
+    a target < 0 is an ID that is not part of the artifact, e.g. from another
+    file or shard, with the string index -target - 1.
+
+    The artifact is written as JSON or as a little-endian binary file:
+    MAGIC, version (uint16), number of strings, entries and targets (uint32),
+    the strings (uint32 length and UTF-8 bytes each), the types (uint8,
+    0 for questions and 1 for answers) and the int32 arrays item_ids,
+    entry_ids, contents, offsets and targets.
+"""
+
+MAGIC = b"HNTR"
+VERSION = 1
+TYPE_CODES = {EntryType.QUESTION: 0, EntryType.ANSWER: 1}
+ARRAY_FIELDS = ["item_ids", "entry_ids", "contents", "offsets", "targets"]
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.indices = dict()
+
+    def add(self, string):
+        if string not in self.indices:
+            self.indices[string] = len(self.strings)
+            self.strings.append(string)
+        return self.indices[string]
+
+
+def shard_prefix(entry):
+    """
+    Default shard key, the non-numeric prefix of the ID of an entry.
+    """
+    return re.match(r"\D*", entry.entry_id)[0]
+
+
+def compile_state(state, shard_key=None):
+    """
+    Compiles the hints of a state into runtime artifacts.
+
+    :param state: State with the hints
+    :param shard_key: Function returning the shard name for an entry,
+    or None to compile all entries into one artifact
+    :return: Dictionary of shard names to artifacts,
+    the only key is "" without sharding
+    """
+    shards = dict()
+    for entry_type in TYPE_CODES:
+        for entry in state.get_content(entry_type):
+            name = "" if shard_key is None else shard_key(entry)
+            shards.setdefault(name, []).append(entry)
+    return {name: compile_entries(entries) for name, entries in
+            shards.items()}
+
+
+def compile_entries(entries):
+    """
+    Compiles a list of entries into a runtime artifact.
+    Following entries that are not in the list are stored as string IDs.
+
+    :param entries: List of questions and answers
+    :return: Artifact as a dictionary
+    """
+    table = StringTable()
+    positions = {(entry.get_entry_type(), entry.entry_id): index for
+                 index, entry in enumerate(entries)}
+    artifact = {"version": VERSION, "types": [], "item_ids": [],
+                "entry_ids": [], "contents": [], "offsets": [0],
+                "targets": []}
+    for entry in entries:
+        entry_type = entry.get_entry_type()
+        next_type = EntryType.ANSWER if entry_type == EntryType.QUESTION \
+            else EntryType.QUESTION
+        artifact["types"].append(TYPE_CODES[entry_type])
+        artifact["item_ids"].append(table.add(entry.item_id))
+        artifact["entry_ids"].append(table.add(entry.entry_id))
+        artifact["contents"].append(table.add(entry.content))
+        for next_id in entry.next_entries:
+            position = positions.get((next_type, next_id))
+            if position is None:
+                position = -table.add(next_id) - 1
+            artifact["targets"].append(position)
+        artifact["offsets"].append(len(artifact["targets"]))
+    artifact["strings"] = table.strings
+    return artifact
+
+
+def write_artifact(artifact, path, binary=False):
+    path = Path(path)
+    if not binary:
+        with path.open("w", encoding="utf-8") as file:
+            json.dump(artifact, file, ensure_ascii=False,
+                      separators=(",", ":"))
+        return
+
+    with path.open("wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<HIII", artifact["version"],
+                               len(artifact["strings"]),
+                               len(artifact["types"]),
+                               len(artifact["targets"])))
+        for string in artifact["strings"]:
+            encoded = string.encode("utf-8")
+            file.write(struct.pack("<I", len(encoded)))
+            file.write(encoded)
+        file.write(bytes(artifact["types"]))
+        for field in ARRAY_FIELDS:
+            values = array("i", artifact[field])
+            if sys.byteorder == "big":
+                values.byteswap()
+            file.write(values.tobytes())
+
+
+def load_artifact(path):
+    """
+    Loads an artifact written by write_artifact.
+
+    :param path: Path to a JSON or binary artifact
+    :return: Artifact as a dictionary
+    """
+    path = Path(path)
+    with path.open("rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            file.seek(0)
+            return json.loads(file.read().decode("utf-8"))
+
+        version, num_strings, num_entries, num_targets = struct.unpack(
+            "<HIII", file.read(struct.calcsize("<HIII")))
+        if version != VERSION:
+            raise ValueError(version)
+        artifact = {"version": version, "strings": []}
+        for _ in range(num_strings):
+            length = struct.unpack("<I", file.read(4))[0]
+            artifact["strings"].append(file.read(length).decode("utf-8"))
+        artifact["types"] = list(file.read(num_entries))
+        lengths = {"offsets": num_entries + 1, "targets": num_targets}
+        for field in ARRAY_FIELDS:
+            values = array("i")
+            values.frombytes(
+                file.read(values.itemsize * lengths.get(field, num_entries)))
+            if sys.byteorder == "big":
+                values.byteswap()
+            artifact[field] = values.tolist()
+        return artifact
+
+
+def export(state, path, binary=False, shard_key=None):
+    """
+    Compiles the state and writes the artifacts. With sharding, every shard
+    is written to its own file, named after the path and the shard.
+
+    :param state: State with the hints
+    :param path: Path to write to
+    :param binary: Write the binary format instead of JSON
+    :param shard_key: Function returning the shard name for an entry
+    :return: List of written paths
+    """
+    path = Path(path)
+    written = []
+    for name, artifact in compile_state(state, shard_key).items():
+        shard_path = path if shard_key is None else path.with_name(
+            "{}_{}{}".format(path.stem, name, path.suffix))
+        write_artifact(artifact, shard_path, binary=binary)
+        written.append(shard_path)
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compile a hints file for the learning platform")
+    parser.add_argument("path", type=str, help="Path to the hints file")
+    parser.add_argument("output", type=str, help="Path to write to")
+    parser.add_argument("--binary", action="store_true",
+                        help="Write the binary format instead of JSON")
+    parser.add_argument("--shard", action="store_true",
+                        help="Write one file per ID prefix")
+    args = parser.parse_args()
+
+    state = State()
+    state.load_from_file(args.path)
+    for written_path in export(state, args.output, binary=args.binary,
+                               shard_key=shard_prefix if args.shard else None):
+        print(written_path)
@@ -1,12 +1,28 @@
 import argparse
+import bisect
+import functools
+import gzip
+import heapq
+import io
+import itertools
+import lzma
+import os
 import re
+import sys
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
 from enum import Enum
 
 import PySimpleGUI as sg
 import yaml
 from pathlib2 import Path
 
+from hintstool.markup import MarkupIndex
+from hintstool.similarity import DEFAULT_THRESHOLD, SimilarityIndex
+
 """
     Simple tool to simplify the creation of hints for the learning platform.
     The tool preserves the existing IDs and adds a given prefix to new entries.
@@ -27,6 +43,20 @@ DEFAULT_PATH = ""
 DEFAULT_PREFIX = "prefix"
 DEFAULT_LENGTH = 4
 AUTO_SAVE = False
+HIGHLIGHT_COLOR = "#4b6a88"
+SERVER_EVENT = "server_requests"
+COMPLETION_LIMIT = 10
+BULK_INSERT_SIZE = 64
+LOAD_EVENT = "load_batch"
+WORKSPACE_EVENT = "workspace_index"
+SAVE_ERROR_EVENT = "save_error"
+# Hints files ending with these suffixes are compressed
+COMPRESSIONS = {".gz": gzip, ".xz": lzma}
+LOAD_BATCH_SIZE = 1000
+LOAD_BATCH_INTERVAL = 0.25
+# Elements creating, removing or linking entries, disabled while loading
+STRUCTURE_KEYS = ("add_question", "add_answer", "remove_entry_question",
+                  "remove_entry_answer", "item_add", "item_remove", "follow")
 
 
 class EntryType(Enum):
@@ -43,11 +73,58 @@ class EntryType(Enum):
             raise ValueError(type)
 
 
+def open_hints_file(path, mode="r"):
+    """
+    Opens a hints file. Files ending with .gz or .xz are decompressed while
+    reading and compressed while writing, without keeping the whole file in
+    memory.
+
+    :param path: Path to the hints file
+    :param mode: "r" or "w" to read or write text, "rb" to read bytes
+    :return: Opened file
+    """
+    path = Path(path)
+    compression = COMPRESSIONS.get(path.suffix.lower())
+    if "b" in mode:
+        if compression is None:
+            return path.open(mode)
+        return compression.open(str(path), mode)
+    if compression is None:
+        return path.open(mode, encoding="utf-8")
+    return compression.open(str(path), mode + "t", encoding="utf-8")
+
+
+def decompressing(raw, path):
+    """
+    Decompresses an opened binary hints file if its path ends with .gz or
+    .xz. The opened file is not closed with the returned file.
+    """
+    compression = COMPRESSIONS.get(Path(path).suffix.lower())
+    return raw if compression is None else compression.open(raw, "rb")
+
+
+def writes(method):
+    """
+    Runs a method of State while holding the write lock of the state.
+    """
+
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self.writing():
+            return method(self, *args, **kwargs)
+
+    return locked
+
+
 class State:
     """
     Handles the state for the tool. This includes the management of hints,
     their creation, removal and editing,
     selecting the following entries and IO operations.
+
+    The state is changed by a single thread, usually the event loop. Methods
+    changing the hints hold the write lock, so other threads can read the
+    hints consistently with the read lock or use a snapshot instead.
     """
 
     def __init__(self, path=None, auto_save=AUTO_SAVE):
@@ -55,13 +132,115 @@ class State:
                         EntryType.ANSWER: AnswersManager()}
         self.entry_mapping = dict()
         self.selected_entry = None
+        self.graph = HintsGraph(self.entries)
+        self.content_pool = ContentPool()
+        self.markup = MarkupIndex()
+        self.ids = {EntryType.QUESTION: IdIndex(),
+                    EntryType.ANSWER: IdIndex()}
+        # IDs of other files, only used to complete manual IDs
+        self.external_ids = {EntryType.QUESTION: IdIndex(),
+                             EntryType.ANSWER: IdIndex()}
+        self.workspace = None
+        self.lock = ReadWriteLock()
+        # Incremented by every change, snapshots are reused until then
+        self.version = 0
+        # Version of the hints last loaded from or saved to the file
+        self.saved_version = 0
+        self._snapshot = None
+        self._save_lock = threading.Lock()
+        self._pending_save = None
+        self._saved = None
+        self._saver = None
+        # Built on first use, since signatures are expensive to compute
+        self.similarity = None
+        self.loader = None
         self.path = Path(path) if path is not None and path != "" else Path(
             "backup.yml")
         self.auto_save = auto_save
 
     def reset(self):
-        self.__init__()
+        self.cancel_loading()
+        self.wait_for_saving()
+        with self.writing():
+            workspace, lock, version = self.workspace, self.lock, self.version
+            self.__init__(auto_save=self.auto_save)
+            # Threads might be waiting for the lock of the state
+            self.lock, self.version = lock, version
+            self.saved_version = version
+            if workspace is not None:
+                self.set_workspace(workspace)
+
+    @contextmanager
+    def writing(self):
+        """
+        Holds the write lock while changing the hints outside of the methods
+        of the state, e.g. when changing entries directly.
+        """
+        with self.lock.write():
+            self.version += 1
+            yield self
+
+    def snapshot(self):
+        """
+        Copies the hints, so they can be used by other threads while the
+        state is changed. The copy is reused as long as nothing has changed.
 
+        :return: Snapshot of the current hints
+        """
+        with self.lock.read():
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self.version:
+                items = self._serialize_format()
+                items.sort(key=lambda x: x[0])
+                snapshot = self._snapshot = Snapshot(self.version, items)
+            return snapshot
+
+    def set_workspace(self, workspace):
+        """
+        Uses the index of a workspace to resolve and complete the IDs of
+        other files.
+
+        :param workspace: WorkspaceIndex of the directory of the hints files
+        """
+        self.workspace = workspace
+        for entry_type in self.external_ids:
+            self.external_ids[entry_type] = IdIndex(workspace.ids(entry_type))
+
+    def find_in_workspace(self, entry_type, entry_id):
+        """
+        Finds the entries with the given ID in the other files of the
+        workspace.
+
+        :return: List of locations
+        """
+        if self.workspace is None:
+            return []
+        path = self.path.resolve()
+        return [location for location in
+                self.workspace.find(entry_type, entry_id) if
+                location.path.resolve() != path]
+
+    def open_location(self, location):
+        """
+        Replaces the hints with the file of an entry found in the workspace
+        and selects the entry. Unsaved changes are saved first if auto save
+        is enabled, otherwise they are discarded.
+
+        :param location: Location of the entry
+        :return: The selected entry or None if it does not exist anymore
+        """
+        if self.auto_save and self.has_unsaved_changes():
+            self.save_to_file()
+        self.reset()
+        self.load_from_file(location.path)
+        manager = self.entries[location.entry_type]
+        if location.entry_id not in manager.entry_mapping:
+            return None
+        self.set_entry(manager.order.index(location.entry_id),
+                       location.entry_type)
+        return self.selected_entry
+
+    @writes
     def load_from_file(self, path=None):
         """
         Load the hints from the file with the given path into the state data.
@@ -70,28 +249,123 @@ class State:
         """
         if path is not None:
             self.path = Path(path)
-        content = {}
-        with self.path.open(encoding="utf-8") as stream:
-            file_content = yaml.safe_load(stream)
-        if file_content is None or file_content == [None]:
-            return
-        for entry in file_content:
-            for key in entry:
-                content[key] = entry[key]
-
-        for key in content:
-            if "question_id" in content[key]:
-                question = YAMLParser.create_question_from_yaml(item_id=key,
-                                                                **content[key])
-                self.entries[EntryType.QUESTION].add_entry(question)
-            elif "answer_id" in content[key]:
-                answer = YAMLParser.create_answer_from_yaml(item_id=key,
-                                                            **content[key])
-                self.entries[EntryType.ANSWER].add_entry(answer)
-            else:
-                print("Found incorrectly formatted entry.")
+        with open_hints_file(self.path) as stream:
+            self.add_loaded_entries(YAMLParser.iter_entries(stream))
 
         self.selected_entry = None
+        self.saved_version = self.version
+
+    @writes
+    def add_loaded_entries(self, entries):
+        """
+        Adds entries parsed from a file to the state.
+
+        :param entries: Iterable of entries
+        """
+        added = {EntryType.QUESTION: [], EntryType.ANSWER: []}
+        for entry in entries:
+            self._register_entry(entry)
+            self.entries[entry.get_entry_type()].add_entry(entry)
+            added[entry.get_entry_type()].append(entry.entry_id)
+        for entry_type, entry_ids in added.items():
+            self.ids[entry_type].update(entry_ids)
+        self.graph.clear()
+
+    @writes
+    def discard_entries(self, entries):
+        """
+        Removes entries from the state without removing references to them.
+
+        :param entries: Iterable of entries
+        """
+        for entry in entries:
+            manager = self.entries[entry.get_entry_type()]
+            self._release_entry(entry)
+            manager.remove_entry(manager.order.index(entry.entry_id))
+            if self.selected_entry is entry:
+                self.selected_entry = None
+        self.graph.clear()
+
+    @writes
+    def rename_entries(self, entry_type, renames):
+        """
+        Changes the IDs of several entries of a type at once.
+        References from other entries are not changed.
+
+        :param entry_type: Type of the renamed entries
+        :param renames: Dictionary mapping old IDs to new IDs
+        """
+        self.entries[entry_type].rename_entries(renames)
+        for old_id, new_id in renames.items():
+            self.ids[entry_type].remove(old_id)
+            self.ids[entry_type].add(new_id)
+        self.graph.clear()
+
+    def load_in_background(self, path, post):
+        """
+        Starts replacing the hints with the file with the given path, which
+        is loaded on a worker thread. The parsed entries are passed in batches
+        to post, which has to hand them over to the thread owning the state
+        for apply_loaded. Entries cannot be created, removed or linked until
+        the file has been loaded, since IDs could be used twice otherwise.
+
+        :param path: Path to the file to load
+        :param post: Function called from the worker thread with each batch
+        :return: The started FileLoader
+        """
+        self.reset()
+        self.loader = FileLoader(path, post).start()
+        return self.loader
+
+    def apply_loaded(self, batch):
+        """
+        Adds a batch of a background load to the state. Batches of cancelled
+        or replaced loads are ignored. The path of the state is only changed
+        once the file has been loaded completely, if the file cannot be read,
+        the entries loaded so far are dropped.
+
+        :param batch: LoadBatch posted by the FileLoader
+        :return: True if the batch has been applied
+        """
+        if batch.loader is not self.loader:
+            return False
+        # Only the batches are part of the file, edits made in between are
+        # still unsaved once the file has been loaded
+        unchanged = self.saved_version == self.version
+        with self.writing():
+            self.add_loaded_entries(batch.entries)
+            if unchanged:
+                self.saved_version = self.version
+            if batch.error is not None:
+                print("Could not load {}: {}".format(batch.loader.path,
+                                                     batch.error))
+                self.loader = None
+                self.reset()
+            elif batch.done:
+                self.path = batch.loader.path
+                self.loader = None
+        return True
+
+    def cancel_loading(self):
+        """
+        Stops a background load. The hints loaded so far are dropped, so
+        a partially loaded file cannot be saved.
+        """
+        if self.loader is not None:
+            self.loader.cancel()
+            self.loader = None
+            self.reset()
+
+    def _check_not_loading(self):
+        if self.is_loading():
+            raise RuntimeError("Entries cannot be created, removed or linked "
+                               "while a file is loaded")
+
+    def is_loading(self):
+        return self.loader is not None
+
+    def has_unsaved_changes(self):
+        return self.version != self.saved_version
 
     def save_to_file(self, path=None):
         """
@@ -104,24 +378,66 @@ class State:
         """
         if path is not None and path != "":
             self.path = Path(path)
-        serialize_format = self._serialize_format()
-        serialize_format.sort(key=lambda x: x[0])
+        # Background saves of older hints must not overwrite the file later
+        self.wait_for_saving()
+        snapshot = self.snapshot()
+        snapshot.save(self.path)
+        self.saved_version = snapshot.version
 
-        yml_dict = [{entry[0]: format_entry(entry[1])} for entry in
-                    serialize_format]
-
-        yaml.add_representer(str, str_representer)
-        yaml.add_representer(list, list_representer)
-        yaml.add_representer(FormattedList, formatted_list_representer)
+    def save_in_background(self, path=None, post_error=None):
+        """
+        Saves the hints on a worker thread, so editing can continue while the
+        file is written. Saves are written in order, a save still waiting for
+        an earlier one is replaced by newer ones. Unchanged hints are not
+        saved to the same file again, unless saving them has failed.
 
-        try:
-            with self.path.open("w", encoding="utf-8") as file:
-                yaml.dump(yml_dict, file, encoding="utf-8", allow_unicode=True,
-                          sort_keys=False)
-        except FileNotFoundError:
-            with Path("crashBackup.yml").open("w", encoding="utf-8") as file:
-                yaml.dump(yml_dict, file, encoding="utf-8", allow_unicode=True,
-                          sort_keys=False)
+        :param path: Path to the file to save to
+        :param post_error: Function called from the worker thread with the
+        path and the error if the file cannot be written, the error is
+        printed otherwise
+        """
+        if path is not None and path != "":
+            self.path = Path(path)
+        snapshot = self.snapshot()
+        with self._save_lock:
+            if self._saved == (snapshot.version, self.path):
+                return
+            self._saved = (snapshot.version, self.path)
+            self._pending_save = (snapshot, self.path, post_error)
+            if self._saver is None:
+                self._saver = threading.Thread(target=self._save_pending,
+                                               daemon=True)
+                self._saver.start()
+
+    def wait_for_saving(self):
+        """
+        Waits until all background saves have been written.
+        """
+        with self._save_lock:
+            saver = self._saver
+        if saver is not None:
+            saver.join()
+
+    def _save_pending(self):
+        while True:
+            with self._save_lock:
+                if self._pending_save is None:
+                    self._saver = None
+                    return
+                snapshot, path, post_error = self._pending_save
+                self._pending_save = None
+            try:
+                snapshot.save(path)
+                self.saved_version = snapshot.version
+            except OSError as error:
+                with self._save_lock:
+                    # The same hints have to be saved again by the next save
+                    if self._saved == (snapshot.version, path):
+                        self._saved = None
+                if post_error is None:
+                    print("Could not save {}: {}".format(path, error))
+                else:
+                    post_error(path, error)
 
     def set_entry(self, idx, entry_type):
         """
@@ -147,8 +463,16 @@ class State:
         """
         Swaps the order of the following entries of the selected entry
         """
-        if self.selected_entry_type() == EntryType.ANSWER:
-            self.selected_entry.swap_next(index_1, index_2)
+        # Swaps without effect do not count as changes, e.g. for auto save
+        if self.selected_entry_type() == EntryType.ANSWER and \
+                index_1 != index_2 and \
+                0 <= index_2 < len(self.selected_entry.next_entries):
+            self._swap_next(index_1, index_2)
+
+    @writes
+    def _swap_next(self, index_1, index_2):
+        self.selected_entry.swap_next(index_1, index_2)
+        self.graph.edges_changed(self.selected_node())
 
     def update_next(self, indices):
         """
@@ -156,46 +480,70 @@ class State:
         Fully replaces with indices.
         :param indices: List of indices for next entries
         """
-        other_entry_type = self.get_unselected_entry_type()
+        self._check_not_loading()
         next_entries = filter(lambda x: x[0] != -1, self.get_next())
         next_entries_indices = set(map(lambda x: x[0], next_entries))
         next_entry_index = next_entries_indices.symmetric_difference(indices)
         if len(next_entry_index) == 0:
             return
         index = list(next_entry_index)[0]
+        self._toggle_next(index, index in next_entries_indices)
+
+    @writes
+    def _toggle_next(self, index, linked):
+        other_entry_type = self.get_unselected_entry_type()
         entry = self.entries[other_entry_type].get_object_by_index(index)
         entry_id = entry.entry_id
-        if index in next_entries_indices:
+        if linked:
             self.selected_entry.remove_next_entry(entry_id)
         else:
             if self.selected_entry_type() == EntryType.QUESTION:
                 self.selected_entry.pop_next_entry(0)
             self.add_next_entry(entry_id)
+        self.graph.edges_changed(self.selected_node())
 
     def get_next(self):
         """
-        Get the next entries for the selected entry
+        Get the next entries for the selected entry. IDs of other files are
+        resolved to their location if a workspace is used.
         :return: Next entries
         """
         other_hint_type = self.get_unselected_entry_type()
         other_hints_manager = self.entries[other_hint_type]
-        return other_hints_manager.next_hints(self.selected_entry.next_entries)
-
+        next_hints = other_hints_manager.next_hints(
+            self.selected_entry.next_entries)
+        if self.workspace is None:
+            return next_hints
+        resolved = []
+        for index, hint in next_hints:
+            locations = self.find_in_workspace(other_hint_type, hint) \
+                if index == -1 else []
+            resolved.append((index, locations[0] if len(locations) > 0
+                             else hint))
+        return resolved
+
+    @writes
     def add_next_entry(self, text):
         """
         Adds a following entry to the selected one.
         Allows for cross-file IDs when given a manual ID.
         :param text: Next entry ID
         """
+        self._check_not_loading()
         self.selected_entry.add_next_entry(text)
+        self.graph.edges_changed(self.selected_node())
 
+    @writes
     def remove_next_entry(self, index):
         """
         Remove entry at the index from the following hints
         :param index: Index of entry to remove
         """
+        self._check_not_loading()
         self.selected_entry.pop_next_entry(index[0])
+        self.graph.edges_changed(self.selected_node())
 
+    @writes
     def create_entry(self, prefix, prefix_length,
                      entry_type=EntryType.QUESTION):
         """
@@ -205,21 +553,40 @@ class State:
         :param entry_type: Hint type to create
         :return: The newly created entry
         """
+        item_id, collection_id = self.allocate_ids(prefix, prefix_length, 1)[0]
+
+        entry = self.entries[entry_type].create_new_entry(item_id,
+                                                          collection_id)
+        self._register_entry(entry)
+        self.ids[entry_type].add(entry.entry_id)
+        self.graph.clear()
+
+        return entry
+
+    def allocate_ids(self, prefix, prefix_length, count, reserved=()):
+        """
+        Finds unique item and entry IDs for several new entries at once.
+        :param prefix: Prefix for the IDs
+        :param prefix_length: Length of the numeric part of the IDs
+        :param count: Number of IDs to find
+        :param reserved: Further entry IDs that are already taken,
+        e.g. manual IDs of entries that are not added yet
+        :return: List of tuples of item ID and entry ID
+        """
+        self._check_not_loading()
         item_ids = [entry.item_id for entry in
                     self.entries[EntryType.QUESTION].get_data()] + \
                    [entry.item_id for entry in
                     self.entries[EntryType.ANSWER].get_data()]
         collection_ids = self.entries[EntryType.QUESTION].order + self.entries[
-            EntryType.ANSWER].order
+            EntryType.ANSWER].order + list(reserved)
 
-        item_id = self._get_next_id(item_ids, ("item" + prefix), prefix_length)
-        collection_id = self._get_next_id(collection_ids, prefix, prefix_length)
-
-        entry = self.entries[entry_type].create_new_entry(item_id,
-                                                          collection_id)
-
-        return entry
+        return list(zip(
+            self._get_next_ids(item_ids, ("item" + prefix), prefix_length,
+                               count),
+            self._get_next_ids(collection_ids, prefix, prefix_length, count)))
 
+    @writes
     def remove_entry(self, idx=-1):
         """
         Removes entry from the hints list.
@@ -227,18 +594,216 @@ class State:
         :param idx: Either -1 or an index within
         the length of the type of selected entry list
         """
+        self._check_not_loading()
         if idx == -1:
             idx = self.entries[self.selected_entry_type()].order.index(
                 self.selected_entry.entry_id)
         other_entry_type = self.get_unselected_entry_type()
+        removed = self.entries[self.selected_entry_type()].get_object_by_index(
+            idx)
+        self._release_entry(removed)
         self.entries[self.selected_entry_type()].remove_entry(idx, self.entries[
             other_entry_type])
         self.selected_entry = None
+        self.graph.clear()
+
+    def update_content(self, content, entry=None):
+        """
+        Changes the content of an entry. Identical contents are shared between
+        entries, the previous content is only released from the pool.
+        :param content: New content
+        :param entry: Entry to change, defaults to the selected entry
+        """
+        entry = self.selected_entry if entry is None else entry
+        # The textbox event is also sent for keys not changing the text
+        if content != entry.content:
+            self._update_content(content, entry)
+
+    @writes
+    def _update_content(self, content, entry):
+        self.content_pool.release(entry.content)
+        entry.update_content(self.content_pool.acquire(content))
+        self.markup.update(entry, content)
+        if self.similarity is not None:
+            self.similarity.update(entry, content)
+
+    def _register_entry(self, entry):
+        entry.content = self.content_pool.acquire(entry.content)
+        self.markup.update(entry, entry.content)
+        if self.similarity is not None:
+            self.similarity.update(entry, entry.content)
+
+    def _release_entry(self, entry):
+        self.ids[entry.get_entry_type()].remove(entry.entry_id)
+        self.content_pool.release(entry.content)
+        self.markup.remove(entry)
+        if self.similarity is not None:
+            self.similarity.remove(entry)
+
+    def complete_id(self, prefix, entry_type=None, external=True,
+                    limit=COMPLETION_LIMIT):
+        """
+        Finds known IDs starting with a prefix, e.g. to complete a manually
+        entered following entry.
+        :param prefix: Beginning of the ID
+        :param entry_type: Type of the IDs, by default the type following the
+        selected entry or both types if no entry is selected
+        :param external: Whether to include the IDs of other files
+        :param limit: Maximal number of IDs
+        :return: Sorted list of IDs
+        """
+        if entry_type is None and self.selected_entry is not None:
+            entry_type = self.get_unselected_entry_type()
+        entry_types = list(self.ids) if entry_type is None else [entry_type]
+        indices = [self.ids[entry_type] for entry_type in entry_types]
+        if external:
+            indices += [self.external_ids[entry_type] for entry_type in
+                        entry_types]
+        completions = heapq.merge(*[index.complete(prefix, limit) for index
+                                    in indices])
+        # IDs can be known from several indices, merged duplicates are adjacent
+        return [entry_id for entry_id, _ in itertools.islice(
+            itertools.groupby(completions), limit)]
+
+    def similar_entries(self, entry=None, threshold=DEFAULT_THRESHOLD):
+        """
+        Finds entries of the same type with a similar content.
+        :param entry: Entry to compare, defaults to the selected entry
+        :param threshold: Minimal estimated similarity between 0 and 1
+        :return: List of entries and their estimated similarity,
+        most similar first
+        """
+        entry = self.selected_entry if entry is None else entry
+        similar = self._similarity_index().similar(entry, threshold)
+        return [(other, estimate) for other, estimate in similar if
+                other.get_entry_type() == entry.get_entry_type()]
+
+    def similar_groups(self, threshold=DEFAULT_THRESHOLD):
+        """
+        Finds groups of entries of the same type with similar contents.
+        :param threshold: Minimal estimated similarity between 0 and 1
+        :return: List of groups as lists of entries sorted by their item IDs
+        """
+        groups = [sorted(group, key=lambda entry: entry.item_id) for group in
+                  self._similarity_index().groups(
+                      threshold, partition=lambda entry: entry.get_entry_type())]
+        groups.sort(key=lambda group: group[0].item_id)
+        return groups
+
+    def _similarity_index(self):
+        if self.similarity is None:
+            self.similarity = SimilarityIndex()
+            for manager in self.entries.values():
+                for entry in manager.entry_mapping.values():
+                    self.similarity.update(entry, entry.content)
+        return self.similarity
+
+    def find_uses(self, value, tag="glossary"):
+        """
+        Returns all entries using a tag with the given value in their content,
+        e.g. glossary<value/>.
+        :param value: Value of the tag
+        :param tag: Name of the tag
+        :return: List of entries sorted by their item IDs
+        """
+        return sorted(self.markup.uses(value, tag),
+                      key=lambda entry: entry.item_id)
+
+    def memory_report(self):
+        """
+        Estimates the memory saved by sharing identical IDs and contents.
+        :return: Dictionary with the number of unique and referenced contents
+        and IDs and the saved bytes for both
+        """
+        ids = []
+        for manager in self.entries.values():
+            for entry in manager.entry_mapping.values():
+                ids += [entry.item_id, entry.entry_id] + entry.next_entries
+        unique_ids = {id(entry_id): entry_id for entry_id in ids}
+        return {
+            "unique_contents": len(self.content_pool),
+            "content_references": self.content_pool.references(),
+            "saved_content_bytes": self.content_pool.saved_bytes(),
+            "unique_ids": len(unique_ids),
+            "id_references": len(ids),
+            "saved_id_bytes": sum(map(sys.getsizeof, ids)) - sum(
+                map(sys.getsizeof, unique_ids.values()))
+        }
 
     def get_unselected_entry_type(self):
         entry_type = EntryType.QUESTION if self.selected_entry_type() == EntryType.ANSWER else EntryType.ANSWER
         return entry_type
 
+    def selected_node(self):
+        return self.selected_entry.get_entry_type(), self.selected_entry.entry_id
+
+    def reachable(self, entry=None, backward=False):
+        """
+        Returns the hints that can be reached from an entry by following
+        the next entries, or that reach the entry when searching backward.
+        :param entry: Entry to start from, defaults to the selected entry
+        :param backward: Search for the hints leading to the entry instead
+        :return: List of reachable entries
+        """
+        entry = self.selected_entry if entry is None else entry
+        return self._entries_for(
+            self.graph.reachable(self.graph.node(entry), backward))
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest chain of hints from source to target.
+        :param source: First entry of the chain
+        :param target: Last entry of the chain
+        :return: List of entries including source and target,
+        or None if target is not reachable
+        """
+        path = self.graph.shortest_path(self.graph.node(source),
+                                        self.graph.node(target))
+        return None if path is None else self._entries_for(path)
+
+    def depth(self, entry=None):
+        """
+        Returns the length of the shortest chain from an entry point to the
+        entry. Entry points are questions that are no next entry of an answer.
+        :param entry: Entry to get the depth of, defaults to the selected entry
+        :return: Depth or None if the entry cannot be reached
+        """
+        entry = self.selected_entry if entry is None else entry
+        return self.graph.depths().get(self.graph.node(entry))
+
+    def is_orphaned(self, entry=None):
+        """
+        Checks if no hint leads to the entry.
+        :param entry: Entry to check, defaults to the selected entry
+        """
+        entry = self.selected_entry if entry is None else entry
+        return len(self.graph.predecessors(self.graph.node(entry))) == 0
+
+    def extract_subgraph(self, path=None, entry=None):
+        """
+        Copies an entry and all hints reachable from it into a new state.
+        :param path: Path to save the new state to, if given
+        :param entry: Entry to start from, defaults to the selected entry
+        :return: The new state
+        """
+        entry = self.selected_entry if entry is None else entry
+        extracted = State(path=path)
+        extracted.add_loaded_entries(
+            reachable_entry.__class__(reachable_entry.item_id,
+                                      reachable_entry.entry_id,
+                                      reachable_entry.next_entries,
+                                      reachable_entry.content)
+            for reachable_entry in [entry] + [other for other in
+                                              self.reachable(entry) if
+                                              other is not entry])
+        if path is not None:
+            extracted.save_to_file()
+        return extracted
+
+    def _entries_for(self, nodes):
+        return [self.entries[entry_type].entry_mapping[entry_id] for
+                entry_type, entry_id in nodes]
+
     def _get_next_id(self, ids, prefix, prefix_length):
         """
         Finds the smallest ID that is unique in a given id list.
@@ -249,16 +814,26 @@ class State:
         :param prefix_length: Length of numeric id
         :return: The next unique ID
         """
-        ids = [pref_id for pref_id in ids if prefix in pref_id]
-        ids.sort(reverse=True)
+        return self._get_next_ids(ids, prefix, prefix_length, 1)[0]
+
+    def _get_next_ids(self, ids, prefix, prefix_length, count):
+        """
+        Finds count consecutive IDs following the highest numeric ID
+        with the given prefix.
+        :param ids: List of existing ids
+        :param prefix: Prefix for id
+        :param prefix_length: Length of numeric id
+        :param count: Number of IDs
+        :return: List of unique IDs
+        """
         highest_id = 0
-        if len(ids) > 0:
-            prefix_matches = re.search(r"(\d+)", ids[0])
-            highest_id = prefix_matches[0] if len(
-                prefix_matches.regs) > 0 else 0
-        next_id = "{}{}".format(prefix,
-                                str(int(highest_id) + 1).zfill(prefix_length))
-        return next_id
+        for pref_id in ids:
+            if prefix in pref_id:
+                prefix_matches = re.search(r"(\d+)", pref_id)
+                if prefix_matches is not None:
+                    highest_id = max(highest_id, int(prefix_matches[0]))
+        return ["{}{}".format(prefix, str(highest_id + i).zfill(prefix_length))
+                for i in range(1, count + 1)]
 
     def _serialize_format(self):
         """
@@ -272,6 +847,415 @@ class State:
         return serial_entries
 
 
+class ReadWriteLock:
+    """
+    Lock shared by several readers or held by a single writer. Waiting
+    writers are preferred, so reading threads cannot hold back changes.
+    The writing thread may acquire the lock again, both for reading and
+    writing, so locked methods can call each other.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._writes = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        if self._writer == threading.get_ident():
+            yield
+            return
+        with self._condition:
+            self._condition.wait_for(lambda: self._writer is None and
+                                     self._waiting_writers == 0)
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        thread = threading.get_ident()
+        with self._condition:
+            if self._writer != thread:
+                self._waiting_writers += 1
+                self._condition.wait_for(lambda: self._writer is None and
+                                         self._readers == 0)
+                self._waiting_writers -= 1
+                self._writer = thread
+            self._writes += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writes -= 1
+                if self._writes == 0:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+class Snapshot:
+    """
+    Copy of the hints of a state at one point in time. Later changes of the
+    state do not change the snapshot, so it can be saved or read by other
+    threads without locking.
+    """
+
+    def __init__(self, version, items):
+        self.version = version
+        # Serialized entries sorted by their item IDs
+        self.items = items
+
+    def entries(self):
+        """
+        Creates new entries from the snapshot.
+
+        :return: Generator of entries
+        """
+        for item_id, item in self.items:
+            # The parser removes the line break ending the content
+            item = dict(item, content=item["content"] + "\n")
+            yield YAMLParser.create_entry_from_yaml(item_id, item)
+
+    def save(self, path):
+        """
+        Saves the hints to the file with the given path, or to
+        "crashBackup.yml" if the directory of the file does not exist.
+        """
+        # The items of the snapshot are shared and must not be formatted
+        yml_dict = [{item_id: format_entry(dict(item))} for item_id, item in
+                    self.items]
+
+        yaml.add_representer(str, str_representer)
+        yaml.add_representer(list, list_representer)
+        yaml.add_representer(FormattedList, formatted_list_representer)
+
+        try:
+            with open_hints_file(path, "w") as file:
+                yaml.dump(yml_dict, file, encoding="utf-8", allow_unicode=True,
+                          sort_keys=False)
+        except FileNotFoundError:
+            with Path("crashBackup.yml").open("w", encoding="utf-8") as file:
+                yaml.dump(yml_dict, file, encoding="utf-8", allow_unicode=True,
+                          sort_keys=False)
+
+    def __len__(self):
+        return len(self.items)
+
+
+class HintsGraph:
+    """
+    Cached queries over the links between the hints of a state.
+    Nodes are tuples of the entry type and the entry ID. Next entries that do
+    not exist, e.g. manual cross-file IDs, are ignored.
+    The cached results are invalidated by the state: edges_changed when the
+    next entries of one entry change, clear when entries are added or removed.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        self.clear()
+
+    def clear(self):
+        self._successors = None
+        self._predecessors = None
+        self._trees = dict()
+        self._reaching = dict()
+        self._depths = None
+
+    @staticmethod
+    def node(entry):
+        return entry.get_entry_type(), entry.entry_id
+
+    def edges_changed(self, node):
+        """
+        Updates the links of a single node and drops only the cached results
+        that may depend on them.
+        """
+        if self._successors is None:
+            return
+        old = self._successors[node]
+        new = self._resolve(node)
+        for successor in old:
+            self._predecessors[successor].discard(node)
+        for successor in new:
+            self._predecessors[successor].add(node)
+        self._successors[node] = new
+
+        changed = set(old).symmetric_difference(new)
+        self._trees = {source: tree for source, tree in self._trees.items() if
+                       source != node and node not in tree}
+        self._reaching = {target: reaching for target, reaching in
+                          self._reaching.items() if
+                          target != node and node not in reaching and
+                          target not in changed and
+                          reaching.isdisjoint(changed)}
+        self._depths = None
+
+    def successors(self, node):
+        self._build()
+        return self._successors[node]
+
+    def predecessors(self, node):
+        self._build()
+        return self._predecessors[node]
+
+    def reachable(self, node, backward=False):
+        """
+        Returns the nodes reachable from a node. The node itself is only
+        included if it is part of a cycle.
+        """
+        if not backward:
+            return frozenset(self._tree(node))
+        if node not in self._reaching:
+            self._reaching[node] = frozenset(
+                self._search(node, self.predecessors))
+        return self._reaching[node]
+
+    def shortest_path(self, source, target):
+        tree = self._tree(source)
+        if target not in tree:
+            return None
+        path = [target]
+        while True:
+            path.append(tree[path[-1]])
+            if path[-1] == source:
+                return path[::-1]
+
+    def depths(self):
+        """
+        Returns the distances of all reachable nodes to the nearest
+        entry point.
+        """
+        if self._depths is None:
+            self._build()
+            self._depths = {node: 0 for node in self._successors if
+                            node[0] == EntryType.QUESTION and
+                            len(self._predecessors[node]) == 0}
+            queue = deque(self._depths)
+            while len(queue) > 0:
+                node = queue.popleft()
+                for successor in self._successors[node]:
+                    if successor not in self._depths:
+                        self._depths[successor] = self._depths[node] + 1
+                        queue.append(successor)
+        return self._depths
+
+    def _tree(self, source):
+        if source not in self._trees:
+            self._trees[source] = self._search(source, self.successors)
+        return self._trees[source]
+
+    @staticmethod
+    def _search(source, neighbours):
+        """
+        Breadth-first search starting at the neighbours of source.
+        :return: Dictionary of reached nodes to the node they were reached from
+        """
+        parents = dict()
+        queue = deque([source])
+        while len(queue) > 0:
+            node = queue.popleft()
+            for neighbour in neighbours(node):
+                if neighbour not in parents:
+                    parents[neighbour] = node
+                    queue.append(neighbour)
+        return parents
+
+    def _build(self):
+        if self._successors is not None:
+            return
+        self._successors = dict()
+        self._predecessors = dict()
+        for entry_type, manager in self.entries.items():
+            for entry_id in manager.order:
+                self._successors[(entry_type, entry_id)] = []
+                self._predecessors[(entry_type, entry_id)] = set()
+        for node in self._successors:
+            self._successors[node] = self._resolve(node)
+            for successor in self._successors[node]:
+                self._predecessors[successor].add(node)
+
+    def _resolve(self, node):
+        entry_type, entry_id = node
+        other_type = EntryType.ANSWER if entry_type == EntryType.QUESTION \
+            else EntryType.QUESTION
+        other_mapping = self.entries[other_type].entry_mapping
+        return [(other_type, next_id) for next_id in
+                self.entries[entry_type].entry_mapping[entry_id].next_entries
+                if next_id in other_mapping]
+
+
+class ContentPool:
+    """
+    Shares identical contents between entries, so repeated contents like
+    "Ja" or code snippets are only stored once. Since strings are immutable,
+    editing an entry only replaces its reference. Contents are reference
+    counted and dropped from the pool once no entry uses them anymore.
+    """
+
+    def __init__(self):
+        self._contents = dict()
+
+    def acquire(self, content):
+        shared = self._contents.get(content)
+        if shared is None:
+            shared = self._contents[content] = [content, 0]
+        shared[1] += 1
+        return shared[0]
+
+    def release(self, content):
+        shared = self._contents.get(content)
+        if shared is None:
+            return
+        shared[1] -= 1
+        if shared[1] <= 0:
+            self._contents.pop(content)
+
+    def references(self):
+        return sum(count for _, count in self._contents.values())
+
+    def saved_bytes(self):
+        return sum((count - 1) * sys.getsizeof(content) for content, count in
+                   self._contents.values())
+
+    def __len__(self):
+        return len(self._contents)
+
+
+class IdIndex:
+    """
+    Sorted array of IDs to find all IDs with a given prefix by binary search.
+    Single IDs are inserted and removed in place, so the index is never
+    rebuilt while editing. IDs are reference counted, since an ID may be
+    added more than once, e.g. by entries of several files.
+    """
+
+    def __init__(self, ids=()):
+        self._ids = []
+        self._counts = dict()
+        self.update(ids)
+
+    def add(self, entry_id):
+        count = self._counts.get(entry_id, 0)
+        if count == 0:
+            bisect.insort(self._ids, entry_id)
+        self._counts[entry_id] = count + 1
+
+    def update(self, ids):
+        """
+        Adds several IDs at once. Many IDs are sorted together instead of
+        inserting them one by one, e.g. while loading a file.
+        """
+        ids = list(ids)
+        if len(ids) < BULK_INSERT_SIZE:
+            for entry_id in ids:
+                self.add(entry_id)
+            return
+        for entry_id in ids:
+            self._counts[entry_id] = self._counts.get(entry_id, 0) + 1
+        self._ids = sorted(self._counts)
+
+    def remove(self, entry_id):
+        count = self._counts.get(entry_id, 0)
+        if count > 1:
+            self._counts[entry_id] = count - 1
+        elif count == 1:
+            self._counts.pop(entry_id)
+            self._ids.pop(bisect.bisect_left(self._ids, entry_id))
+
+    def clear(self):
+        self._ids = []
+        self._counts.clear()
+
+    def complete(self, prefix, limit=None):
+        """
+        Returns the sorted IDs starting with prefix, at most limit many.
+        """
+        start = bisect.bisect_left(self._ids, prefix)
+        stop = start
+        while stop < len(self._ids) and (limit is None or
+                                         stop - start < limit) and \
+                self._ids[stop].startswith(prefix):
+            stop += 1
+        return self._ids[start:stop]
+
+    def __contains__(self, entry_id):
+        return entry_id in self._counts
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class LoadBatch:
+    def __init__(self, loader, entries, progress, done=False, error=None):
+        self.loader = loader
+        self.entries = entries
+        self.progress = progress
+        self.done = done
+        self.error = error
+
+
+class FileLoader:
+    """
+    Parses a hints file on a worker thread. Entries are posted in batches,
+    at the latest every LOAD_BATCH_INTERVAL seconds, so the first entries
+    can be shown while the rest of the file is parsed.
+    """
+
+    def __init__(self, path, post, batch_size=LOAD_BATCH_SIZE,
+                 interval=LOAD_BATCH_INTERVAL):
+        self.path = Path(path)
+        self.post = post
+        self.batch_size = batch_size
+        self.interval = interval
+        self.cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def join(self, timeout=None):
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        progress = 0
+        try:
+            with self.path.open("rb") as raw:
+                size = max(1, os.fstat(raw.fileno()).st_size)
+                stream = io.TextIOWrapper(decompressing(raw, self.path),
+                                          encoding="utf-8")
+                last_post = time.monotonic()
+                for entry in YAMLParser.iter_entries(stream):
+                    if self.cancelled.is_set():
+                        return
+                    batch.append(entry)
+                    if len(batch) >= self.batch_size or \
+                            time.monotonic() - last_post >= self.interval:
+                        # Bytes read by the parser so far, before decompression
+                        progress = min(1, raw.tell() / size)
+                        self.post(LoadBatch(self, batch, progress))
+                        batch = []
+                        last_post = time.monotonic()
+        except (OSError, EOFError, lzma.LZMAError, UnicodeDecodeError,
+                yaml.YAMLError) as error:
+            self.post(LoadBatch(self, batch, progress, error=error))
+            return
+        if not self.cancelled.is_set():
+            self.post(LoadBatch(self, batch, 1, done=True))
+
+
 class HintsManager(ABC):
     def __init__(self, order=None, entry_mapping=None):
         self.order = [] if order is None else order
@@ -287,14 +1271,34 @@ class HintsManager(ABC):
         self.add_entry(entry)
         return entry
 
-    def remove_entry(self, entry_pos, other_hints_manager):
+    def remove_entry(self, entry_pos, other_hints_manager=None):
+        """
+        Removes the entry at the given position. References to it are removed
+        from the entries of other_hints_manager, unless it is None.
+        """
         entry_id = self.order[entry_pos]
-        for entry in other_hints_manager.entry_mapping.values():
-            if entry_id in entry.next_entries:
-                entry.next_entries.remove(entry_id)
+        if other_hints_manager is not None:
+            for entry in other_hints_manager.entry_mapping.values():
+                if entry_id in entry.next_entries:
+                    entry.next_entries.remove(entry_id)
         self.order.pop(entry_pos)
         self.entry_mapping.pop(entry_id)
 
+    def rename_entries(self, renames):
+        """
+        Changes the IDs of several entries at once, so IDs can be swapped
+        between entries. References from other entries are not changed.
+
+        :param renames: Dictionary mapping old IDs to new IDs
+        """
+        renamed = {old_id: self.entry_mapping.pop(old_id)
+                   for old_id in renames}
+        for old_id, entry in renamed.items():
+            entry.entry_id = intern_id(renames[old_id])
+            self.entry_mapping[entry.entry_id] = entry
+        self.order = [renames.get(entry_id, entry_id)
+                      for entry_id in self.order]
+
     def get_data(self):
         return [self.entry_mapping[id] for id in self.order]
 
@@ -333,11 +1337,20 @@ class AnswersManager(HintsManager):
         return Answer(item_id, entry_id)
 
 
+def intern_id(entry_id):
+    """
+    Interns an ID, since IDs are repeated in many next entries. Numeric IDs,
+    e.g. question_options: [1, 2], are used as strings like all other IDs.
+    """
+    return sys.intern(str(entry_id))
+
+
 class Entry(ABC):
     def __init__(self, item_id, entry_id, next_entries=None, content=""):
-        self.item_id = item_id
-        self.entry_id = entry_id
-        self.next_entries = [] if next_entries is None else next_entries
+        self.item_id = intern_id(item_id)
+        self.entry_id = intern_id(entry_id)
+        self.next_entries = [] if next_entries is None else [
+            intern_id(next_entry) for next_entry in next_entries]
         self.content = content
 
     @abstractmethod
@@ -368,12 +1381,88 @@ class Entry(ABC):
 
 
 class YAMLParser:
+    @staticmethod
+    def iter_items(stream):
+        """
+        Reads the top level list of a hints file one item at a time,
+        so that large files do not have to be parsed completely at once.
+
+        :param stream: Opened hints file
+        :return: Generator of item IDs and their YAML content
+        """
+        for item_id, item, _ in YAMLParser.iter_items_with_offsets(stream):
+            yield item_id, item
+
+    @staticmethod
+    def iter_items_with_offsets(stream):
+        """
+        Reads the top level list of a hints file like iter_items.
+
+        :param stream: Opened hints file
+        :return: Generator of item IDs, their YAML content and the character
+        offset of the item in the stream
+        """
+        loader = yaml.SafeLoader(stream)
+        try:
+            # Skip the start of the stream and of the document
+            loader.get_event()
+            loader.get_event()
+            if not loader.check_event(yaml.SequenceStartEvent):
+                return
+            loader.get_event()
+            while not loader.check_event(yaml.SequenceEndEvent):
+                node = loader.compose_node(None, None)
+                item = loader.construct_object(node, deep=True)
+                # Parsed items are not needed anymore by the loader
+                loader.constructed_objects = {}
+                loader.anchors = {}
+                if not isinstance(item, dict):
+                    continue
+                for item_id in item:
+                    yield item_id, item[item_id], node.start_mark.index
+        finally:
+            loader.dispose()
+
+    @staticmethod
+    def iter_entries(stream):
+        """
+        Reads the entries of a hints file one at a time.
+        Incorrectly formatted items are skipped.
+
+        :param stream: Opened hints file
+        :return: Generator of entries
+        """
+        for item_id, item in YAMLParser.iter_items(stream):
+            entry = YAMLParser.create_entry_from_yaml(item_id, item)
+            if entry is None:
+                print("Found incorrectly formatted entry.")
+                continue
+            yield entry
+
+    @staticmethod
+    def create_entry_from_yaml(item_id, item):
+        """
+        Creates a question or an answer from a parsed item.
+
+        :param item_id: ID of the item
+        :param item: YAML content of the item
+        :return: The created entry or None if the item is invalid
+        """
+        if not isinstance(item, dict):
+            return None
+        if "question_id" in item:
+            return YAMLParser.create_question_from_yaml(item_id=item_id,
+                                                        **item)
+        elif "answer_id" in item:
+            return YAMLParser.create_answer_from_yaml(item_id=item_id, **item)
+        return None
+
     @staticmethod
     def create_question_from_yaml(item_id, question_id, following_answer_id,
                                   content):
         content = content.removesuffix("\n")
-        next_entries = [following_answer_id] if len(
-            following_answer_id) > 0 else []
+        next_entries = [following_answer_id] if following_answer_id not in (
+            "", None) else []
         return Question(item_id, entry_id=question_id,
                         next_entries=next_entries, content=content)
 
@@ -389,7 +1478,7 @@ class Question(Entry):
         return EntryType.QUESTION
 
     def add_next_entry(self, next_entry):
-        self.next_entries = [next_entry]
+        self.next_entries = [intern_id(next_entry)]
 
     def serialize(self):
         return (self.item_id, {
@@ -405,7 +1494,7 @@ class Answer(Entry):
         return EntryType.ANSWER
 
     def add_next_entry(self, next_entry):
-        self.next_entries.append(next_entry)
+        self.next_entries.append(intern_id(next_entry))
 
     def swap_next(self, index_1, index_2):
         next_list = self.next_entries
@@ -417,7 +1506,8 @@ class Answer(Entry):
     def serialize(self):
         return (self.item_id, {
             "answer_id": self.entry_id,
-            "question_options": self.next_entries,
+            # Copied, so serialized entries do not change with the entry
+            "question_options": list(self.next_entries),
             "content": self.content
         })
 
@@ -498,7 +1588,10 @@ def make_window(prefix=DEFAULT_PREFIX, prefix_len=DEFAULT_LENGTH):
                         [[sg.Text("Prefix:"),
                           sg.InputText(prefix, key="prefix"),
                           sg.Text("Prefix num. length:"),
-                          sg.InputText(str(prefix_len), key="prefix_length")]],
+                          sg.InputText(str(prefix_len), key="prefix_length"),
+                          sg.Checkbox("Highlight reachable",
+                                      key="highlight_reachable",
+                                      enable_events=True)]],
                         title="editor")
 
     # Editor for the hints
@@ -516,9 +1609,14 @@ def make_window(prefix=DEFAULT_PREFIX, prefix_len=DEFAULT_LENGTH):
         [sg.Button(button_text="Up", size=(8, 1), key="item_up"),
          sg.Button(button_text="Down", size=(8, 1), key="item_down"),
          sg.Button(button_text="Remove", size=(8, 1), key="item_remove"),
-         sg.InputText("prefexample001", size=(20, 1), key="other_id"),
+         sg.InputText("prefexample001", size=(20, 1), key="other_id",
+                      enable_events=True),
          sg.Button(button_text="Add", size=(8, 1), key="item_add")
          ],
+        # Known IDs starting with the entered ID
+        [sg.Listbox(values=[], select_mode=sg.LISTBOX_SELECT_MODE_SINGLE,
+                    size=(30, 4), key="id_suggestions", expand_x=True,
+                    enable_events=True)],
         [sg.Listbox(values=[], select_mode=sg.LISTBOX_SELECT_MODE_SINGLE,
                     size=(30, 20), bind_return_key=True,
                     key='follow',
@@ -526,17 +1624,33 @@ def make_window(prefix=DEFAULT_PREFIX, prefix_len=DEFAULT_LENGTH):
                     enable_events=True)]
     ], title="Next entries", expand_x=True, expand_y=True)
 
+    # Hints with a content similar to the selected entry,
+    # only computed when enabled
+    similar_frame = sg.Frame(layout=[
+        [sg.Checkbox("Show similar hints", key="show_similar",
+                     enable_events=True)],
+        [sg.Listbox(values=[], select_mode=sg.LISTBOX_SELECT_MODE_SINGLE,
+                    size=(30, 5), key="similar", expand_x=True,
+                    horizontal_scroll=True, enable_events=True)]
+    ], title="Similar hints", expand_x=True)
+
     # Right half of the window
     right_col = [
         [pref_row],
         [textbox],
-        [next_frame]
+        [next_frame],
+        [similar_frame]
     ]
 
     # Overall layout of the window, including the menu options for the tool
     layout = [[sg.Menu(
-        [["File", ["New", "Open    Crtl+o", "Save    Ctrl+s", "Save As"]]])],
-        [sg.Text('Hints editor', font='Any 20')],
+        [["File", ["New", "Open    Crtl+o", "Save    Ctrl+s", "Save As",
+                   "Extract reachable", "Open workspace"]]])],
+        [sg.Text('Hints editor', font='Any 20'),
+         sg.ProgressBar(100, orientation="h", size=(20, 10),
+                        key="load_progress", visible=False),
+         sg.Button(button_text="Cancel", size=(8, 1), key="load_cancel",
+                   visible=False)],
         [sg.Column(left_col, element_justification='l', expand_x=True,
                    expand_y=True),
          sg.Column(right_col, element_justification='c', expand_x=True,
@@ -583,6 +1697,9 @@ def update_window(state, window, components):
             state.get_content(entry_type=EntryType.QUESTION),
             set_to_index=indices, scroll_to_index=scroll_to_index)
 
+    if "question_list" in components or "answer_list" in components:
+        highlight_reachable(state, window, components)
+
     if "textbox" in components:
         # Only show text in the hints text editor
         # when an entry is actually selected
@@ -619,6 +1736,35 @@ def update_window(state, window, components):
         else:
             window["follow_order"].update([])
 
+    if "id_suggestions" in components:
+        window["id_suggestions"].update(
+            state.complete_id(window["other_id"].get()))
+
+    if "similar" in components:
+        if state.selected_entry is not None and window["show_similar"].get():
+            window["similar"].update(
+                ["{:.0%} {}".format(estimate, entry) for entry, estimate in
+                 state.similar_entries()])
+        else:
+            window["similar"].update([])
+
+
+def highlight_reachable(state, window, components):
+    """
+    Colors the hints reachable from the selected entry in the given lists,
+    if enabled. Colors are reset by updating the lists.
+    """
+    if state.selected_entry is None or not window["highlight_reachable"].get():
+        return
+    reachable = state.graph.reachable(state.selected_node())
+    for entry_type, key in [(EntryType.QUESTION, "question_list"),
+                            (EntryType.ANSWER, "answer_list")]:
+        if key not in components:
+            continue
+        for index, entry_id in enumerate(state.entries[entry_type].order):
+            if (entry_type, entry_id) in reachable:
+                window[key].Widget.itemconfig(index, bg=HIGHLIGHT_COLOR)
+
 
 def event_helper(event, reverse=False):
     if "question" in event:
@@ -631,15 +1777,18 @@ def event_helper(event, reverse=False):
     return trigger_type
 
 
-def event_loop(state, window):
+def event_loop(state, window, server=None):
     """
     Processes events in the tool window.
     :param state: State object with hints to change
     :param window: Window to listen to
+    :param server: Optional StateServer, whose requests are executed
+    between the events of the window
     """
     while True:
-        if state.auto_save:
-            state.save_to_file()
+        # Do not overwrite a file with partially loaded hints
+        if state.auto_save and not state.is_loading():
+            state.save_in_background(post_error=post_save_error(window))
         event, values = window.read()
         if event is None:
             break
@@ -647,6 +1796,42 @@ def event_loop(state, window):
 
         menu_events(event, state, window)
 
+        if event == LOAD_EVENT or event == "load_cancel":
+            load_events(event, values, state, window)
+
+        if event == "highlight_reachable":
+            update_window(state, window, ["question_list", "answer_list"])
+
+        if event == "show_similar":
+            update_window(state, window, ["similar"])
+
+        if event == SAVE_ERROR_EVENT:
+            path, error = values[SAVE_ERROR_EVENT]
+            # Otherwise every following event would fail to save again
+            state.auto_save = False
+            sg.popup_error("Could not save {}: {}\nAuto save has been turned "
+                           "off, use Save As to save the hints.".format(
+                               path, error), title="Save failed")
+
+        if event == WORKSPACE_EVENT:
+            state.set_workspace(values[WORKSPACE_EVENT])
+            update_window(state, window, ["follow_order", "id_suggestions"])
+
+        if event == "other_id":
+            update_window(state, window, ["id_suggestions"])
+
+        if event == "id_suggestions":
+            suggestions = values["id_suggestions"]
+            if len(suggestions) > 0:
+                window["other_id"].update(suggestions[0])
+                update_window(state, window, ["id_suggestions"])
+
+        if server is not None and event == SERVER_EVENT:
+            if server.process_pending() > 0:
+                update_window(state, window,
+                              ["answer_list", "question_list", "textbox",
+                               "follow", "follow_order"])
+
         if event_type != "":
             if "_list" in event:
                 index = window[event].get_indexes()
@@ -655,7 +1840,8 @@ def event_loop(state, window):
                 state.set_entry(index[0], EntryType.from_str(event_type))
                 update_window(state, window,
                               ["question_list", "answer_list", "textbox",
-                               "follow", "follow_order"])
+                               "follow", "follow_order", "similar",
+                               "id_suggestions"])
 
             elif "add_" in event:
                 selected_list = event_type + "_list"
@@ -666,7 +1852,7 @@ def event_loop(state, window):
                 state.selected_entry = entry
                 update_window(state, window,
                               [selected_list, "textbox", "follow",
-                               "follow_order"])
+                               "follow_order", "similar"])
 
         if state.selected_entry is not None:
             selected_entry_events(event, state, window)
@@ -680,22 +1866,42 @@ def menu_events(event, state, window):
     """
     if event == sg.WIN_CLOSED or event == 'Exit':
         return
+    # Checked first, since "Open" would match it as well
+    elif "Open workspace" == event:
+        root = sg.popup_get_folder("Workspace", no_window=True)
+        if root == "" or root == ():
+            return
+        open_workspace_in_background(root, window)
     elif "Open" in event:
         path = sg.popup_get_file("Hints file", no_window=True)
         if path == "" or path == ():
             return
-        state.load_from_file(path)
+        if state.auto_save:
+            state.save_to_file()
+        state.load_in_background(
+            path, lambda batch: window.write_event_value(LOAD_EVENT, batch))
+        window["load_progress"].update(current_count=0, visible=True)
+        window["load_cancel"].update(visible=True)
+        disable_structure_edits(state, window)
         update_window(state, window,
                       ["answer_list", "question_list", "textbox", "follow",
-                       "follow_order"])
+                       "follow_order", "similar"])
     elif "Save" in event:
         if state.path == "" or event == "Save As":
             path = sg.popup_get_file("Hints file", no_window=True, save_as=True)
             if path == "" or path == ():
                 return
-            state.save_to_file(path=path)
+            state.save_in_background(path=path,
+                                     post_error=post_save_error(window))
         else:
-            state.save_to_file()
+            state.save_in_background(post_error=post_save_error(window))
+    elif "Extract reachable" == event:
+        if state.selected_entry is None:
+            return
+        path = sg.popup_get_file("Hints file", no_window=True, save_as=True)
+        if path == "" or path == ():
+            return
+        state.extract_subgraph(path=path)
     elif "New" == event:
         if state.auto_save:
             state.save_to_file()
@@ -706,6 +1912,60 @@ def menu_events(event, state, window):
                        "follow_order"])
 
 
+def post_save_error(window):
+    """
+    Returns a function for failed background saves, which posts the path
+    and the error to the window.
+    """
+    return lambda path, error: window.write_event_value(
+        SAVE_ERROR_EVENT, (path, error))
+
+
+def open_workspace_in_background(root, window):
+    """
+    Refreshes the index of a workspace on a worker thread and posts it to
+    the window.
+    """
+    from hintstool.workspace import open_workspace
+
+    def run():
+        try:
+            window.write_event_value(WORKSPACE_EVENT, open_workspace(root))
+        except OSError as error:
+            print("Could not index {}: {}".format(root, error))
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def load_events(event, values, state, window):
+    """
+    Handles the batches of a background load and its cancellation.
+    """
+    if event == "load_cancel":
+        state.cancel_loading()
+    elif not state.apply_loaded(values[LOAD_EVENT]):
+        return
+    else:
+        window["load_progress"].update(
+            current_count=int(values[LOAD_EVENT].progress * 100))
+    update_window(state, window, ["answer_list", "question_list", "follow"])
+    if not state.is_loading():
+        window["load_progress"].update(visible=False)
+        window["load_cancel"].update(visible=False)
+        disable_structure_edits(state, window)
+        # Cancelled or failed loads drop the selected entry
+        update_window(state, window, ["textbox", "follow_order"])
+
+
+def disable_structure_edits(state, window):
+    """
+    Disables creating, removing and linking entries while a file is loaded,
+    since IDs of entries that are not loaded yet could be used again.
+    """
+    for key in STRUCTURE_KEYS:
+        window[key].update(disabled=state.is_loading())
+
+
 def selected_entry_events(event, state, window):
     """
     Handles all events related to the currently selected entry, especially
@@ -722,8 +1982,53 @@ def selected_entry_events(event, state, window):
         update_window(state, window, [selected_list])
 
     if event == "textbox":
-        state.selected_entry.content = window["textbox"].get()
-        update_window(state, window, ["question_list", "answer_list"])
+        state.update_content(window["textbox"].get())
+        update_window(state, window, ["question_list", "answer_list",
+                                      "similar"])
+
+    elif event == "similar":
+        index = window["similar"].get_indexes()
+        if len(index) == 0:
+            return
+        entry = state.similar_entries()[index[0]][0]
+        entry_type = entry.get_entry_type()
+        state.set_entry(state.entries[entry_type].order.index(entry.entry_id),
+                        entry_type)
+        list_key = "question_list" if entry_type == EntryType.QUESTION \
+            else "answer_list"
+        window[list_key].update(set_to_index=[state.entries[
+            entry_type].order.index(entry.entry_id)])
+        update_window(state, window,
+                      ["question_list", "answer_list", "textbox", "follow",
+                       "follow_order", "similar"])
+
+    elif event == "follow_order":
+        # Entries of other files are opened by double click or return
+        index = window["follow_order"].get_indexes()
+        if len(index) == 0:
+            return
+        position, hint = state.get_next()[index[0]]
+        if position != -1 or isinstance(hint, str):
+            return
+        if not state.auto_save and state.has_unsaved_changes():
+            answer = sg.popup_yes_no(
+                "Save the changes to {} before opening {}?".format(
+                    state.path.name, hint.path.name), title="Unsaved changes")
+            if answer is None:
+                return
+            if answer == "Yes":
+                state.save_to_file()
+        entry = state.open_location(hint)
+        if entry is not None:
+            list_key = "question_list" \
+                if hint.entry_type == EntryType.QUESTION else "answer_list"
+            window[list_key].update(
+                state.get_content(entry_type=hint.entry_type),
+                set_to_index=[state.entries[hint.entry_type].order.index(
+                    entry.entry_id)])
+        update_window(state, window,
+                      ["question_list", "answer_list", "textbox", "follow",
+                       "follow_order", "similar", "id_suggestions"])
 
     elif event == "follow":
         update_window(state, window, ["follow_order"])
@@ -755,7 +2060,7 @@ def selected_entry_events(event, state, window):
         update_window(state, window, ["follow", "follow_order"])
 
 
-if __name__ == "__main__":
+def main():
     parser = argparse.ArgumentParser(
         description="Parse config values for the tool")
 
@@ -767,6 +2072,14 @@ if __name__ == "__main__":
                         help="Length of the numeric part of the ID")
     parser.add_argument("--auto-save", type=bool, default=AUTO_SAVE,
                         help="Automatically save to file when exiting")
+    parser.add_argument("--server-port", type=int, default=None,
+                        help="Serve the opened hints to local scripts")
+    parser.add_argument("--workspace", type=str, default=None,
+                        help="Directory of hints files to resolve IDs of "
+                             "other files")
+    parser.add_argument("--record", type=str, default=None,
+                        help="Record the events to a trace file, which can be "
+                             "replayed with hintstool.session")
     args = parser.parse_args()
 
     window = make_window(prefix=args.prefix, prefix_len=args.default_len)
@@ -782,8 +2095,32 @@ if __name__ == "__main__":
                   ["answer_list", "question_list", "textbox", "follow",
                    "follow_order"])
 
-    event_loop(state, window)
+    if args.workspace is not None:
+        open_workspace_in_background(args.workspace, window)
+
+    if args.record is not None:
+        from hintstool.session import SessionRecorder
+        window = SessionRecorder(window, args.record, state.path)
+
+    server = None
+    if args.server_port is not None:
+        from hintstool.server import StateServer
+        server = StateServer(state, args.server_port,
+                             on_request=lambda: window.write_event_value(
+                                 SERVER_EVENT, None)).start()
 
+    event_loop(state, window, server)
+
+    if server is not None:
+        server.stop()
     window.close()
+    state.wait_for_saving()
     if state.auto_save:
         state.save_to_file()
+
+
+if __name__ == "__main__":
+    # Run as hintstool.gui, so the other modules use the same classes
+    from hintstool.gui import main as gui_main
+
+    gui_main()
@@ -0,0 +1,202 @@
+import argparse
+import csv
+import re
+
+from pathlib2 import Path
+
+from hintstool.gui import DEFAULT_LENGTH, DEFAULT_PREFIX, Answer, EntryType, \
+    Question, State
+
+"""
+    Imports hints from CSV or TSV files, e.g. exported from a spreadsheet.
+
+    The first row names the columns: type ("question" or "answer"), id
+    (optional), content and next. Rows without an ID get a new one with the
+    given prefix. The next column lists the IDs of the following entries,
+    separated by spaces, commas or semicolons. Entries without an ID can be
+    referenced by their row number in the spreadsheet, e.g. #2 for the first
+    row after the header. IDs that are neither imported nor part of the state
+    are kept as manual cross-file IDs.
+"""
+
+COLUMN_NAMES = {"type": "type", "id": "id", "content": "content",
+                "next": "next", "successors": "next"}
+NEXT_SEPARATOR = re.compile(r"[\s,;]+")
+ENTRY_CLASSES = {EntryType.QUESTION: Question, EntryType.ANSWER: Answer}
+
+
+class RowError:
+    def __init__(self, row, message):
+        self.row = row
+        self.message = message
+
+    def __str__(self):
+        return "Row {}: {}".format(self.row, self.message)
+
+
+class ImportRow:
+    def __init__(self, row, entry_type, entry_id, content, next_refs):
+        self.row = row
+        self.entry_type = entry_type
+        self.entry_id = entry_id
+        self.content = content
+        self.next_refs = next_refs
+        self.entry = None
+
+
+def open_rows(path):
+    """
+    Reads the rows of a CSV or TSV file as dictionaries of the known columns.
+    Files ending with .tsv or .tab are read tab separated, otherwise the
+    separator is detected from the beginning of the file.
+
+    :param path: Path to the file
+    :return: Generator of row numbers and rows
+    """
+    path = Path(path)
+    with path.open(encoding="utf-8-sig", newline="") as stream:
+        if path.suffix.lower() in (".tsv", ".tab"):
+            dialect = csv.excel_tab
+        else:
+            try:
+                dialect = csv.Sniffer().sniff(stream.read(4096), ",;\t")
+            except csv.Error:
+                dialect = csv.excel
+            stream.seek(0)
+        reader = csv.reader(stream, dialect)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = [COLUMN_NAMES.get(name.strip().lower()) for name in header]
+        for row, values in enumerate(reader, start=2):
+            yield row, {column: value for column, value in
+                        zip(columns, values) if column is not None}
+
+
+def import_rows(state, rows, prefix=DEFAULT_PREFIX,
+                prefix_length=DEFAULT_LENGTH):
+    """
+    Adds rows to the state. Rows with errors are skipped, all other rows are
+    imported. IDs are allocated for all rows at once and the next entries are
+    resolved after all rows have been read.
+
+    :param state: State to add the entries to
+    :param rows: Iterable of row numbers and dictionaries with the columns
+    :param prefix: Prefix for new IDs
+    :param prefix_length: Length of the numeric part of new IDs
+    :return: List of imported entries and list of RowErrors
+    """
+    errors = []
+    import_rows_by_number = dict()
+    manual_ids = {EntryType.QUESTION: dict(), EntryType.ANSWER: dict()}
+    for row, values in rows:
+        try:
+            entry_type = EntryType.from_str(
+                values.get("type", "").strip().lower())
+        except ValueError:
+            errors.append(RowError(row, "Unknown type '{}'".format(
+                values.get("type", ""))))
+            continue
+        entry_id = values.get("id", "").strip()
+        next_refs = [ref for ref in
+                     NEXT_SEPARATOR.split(values.get("next", "")) if ref != ""]
+        if entry_type == EntryType.QUESTION and len(next_refs) > 1:
+            errors.append(RowError(row, "A question has at most one answer"))
+            continue
+        if entry_id != "":
+            if entry_id in manual_ids[entry_type] or \
+                    entry_id in state.entries[entry_type].entry_mapping:
+                errors.append(RowError(row, "Duplicate ID '{}'".format(
+                    entry_id)))
+                continue
+            manual_ids[entry_type][entry_id] = row
+        import_rows_by_number[row] = ImportRow(row, entry_type, entry_id,
+                                               values.get("content", ""),
+                                               next_refs)
+
+    import_list = list(import_rows_by_number.values())
+    reserved = list(manual_ids[EntryType.QUESTION]) + list(
+        manual_ids[EntryType.ANSWER])
+    new_ids = iter(state.allocate_ids(prefix, prefix_length, len(import_list),
+                                      reserved=reserved))
+    for import_row in import_list:
+        item_id, entry_id = next(new_ids)
+        if import_row.entry_id == "":
+            import_row.entry_id = entry_id
+        import_row.entry = ENTRY_CLASSES[import_row.entry_type](
+            item_id, import_row.entry_id, content=import_row.content)
+
+    failed = dict()
+    referencing = dict()
+    for import_row in import_list:
+        for index, ref in enumerate(import_row.next_refs):
+            if not ref.startswith("#"):
+                continue
+            target = import_rows_by_number.get(
+                int(ref[1:]) if ref[1:].isdigit() else None)
+            if target is None:
+                failed[import_row.row] = "Invalid reference '{}'".format(ref)
+            elif target.entry_type == import_row.entry_type:
+                failed[import_row.row] = "Reference '{}' has the same type" \
+                    .format(ref)
+            else:
+                import_row.next_refs[index] = target.entry_id
+                referencing.setdefault(target.row, []).append(import_row.row)
+
+    # Rows referencing skipped rows are skipped as well
+    skipped = list(failed)
+    while len(skipped) > 0:
+        skipped_row = skipped.pop()
+        for row in referencing.get(skipped_row, []):
+            if row not in failed:
+                failed[row] = "References row {} with errors".format(
+                    skipped_row)
+                skipped.append(row)
+    errors += [RowError(row, message) for row, message in failed.items()]
+
+    entries = []
+    for import_row in import_list:
+        if import_row.row in failed:
+            continue
+        for next_id in import_row.next_refs:
+            import_row.entry.add_next_entry(next_id)
+        entries.append(import_row.entry)
+
+    state.add_loaded_entries(entries)
+    errors.sort(key=lambda error: error.row)
+    return entries, errors
+
+
+def import_file(state, path, prefix=DEFAULT_PREFIX,
+                prefix_length=DEFAULT_LENGTH):
+    """
+    Adds the rows of a CSV or TSV file to the state.
+
+    :return: List of imported entries and list of RowErrors
+    """
+    return import_rows(state, open_rows(path), prefix, prefix_length)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Import hints from a CSV or TSV file")
+    parser.add_argument("path", type=str, help="Path to the CSV or TSV file")
+    parser.add_argument("output", type=str,
+                        help="Hints file to add the hints to")
+    parser.add_argument("--prefix", type=str, default=DEFAULT_PREFIX,
+                        help="Prefix for the IDs")
+    parser.add_argument("--default-len", type=int, default=DEFAULT_LENGTH,
+                        help="Length of the numeric part of the ID")
+    args = parser.parse_args()
+
+    state = State(path=args.output)
+    if Path(args.output).is_file():
+        state.load_from_file()
+    imported, row_errors = import_file(state, args.path, args.prefix,
+                                       args.default_len)
+    for row_error in row_errors:
+        print(row_error)
+    state.save_to_file()
+    print("Imported {} hints into {}".format(len(imported), state.path))
+    if len(row_errors) > 0:
+        raise SystemExit(1)
@@ -0,0 +1,174 @@
+import argparse
+import re
+
+from pathlib2 import Path
+
+"""
+    Tokenizer and index for the markup of the learning platform in the
+    content of hints, e.g. glossary<Test/> or code<import/>.
+"""
+
+KNOWN_TAGS = ("glossary", "code")
+HINTS_FILE_PATTERNS = ("*.yml", "*.yml.gz", "*.yml.xz")
+TAG_PATTERN = re.compile(r"(\w+)<([^<>]*?)/>")
+
+
+class Token:
+    def __init__(self, text, tag=None, start=0):
+        self.text = text
+        self.tag = tag
+        self.start = start
+
+    def is_tag(self):
+        return self.tag is not None
+
+    def __eq__(self, other):
+        return isinstance(other, Token) and (self.text, self.tag,
+                                             self.start) == (
+                   other.text, other.tag, other.start)
+
+    def __repr__(self):
+        return "Token({!r}, {!r}, {})".format(self.text, self.tag, self.start)
+
+
+def tokenize(content):
+    """
+    Splits content into plain text and tags in a single pass.
+    For tags, text is the value between the angle brackets.
+
+    :param content: Content of a hint
+    :return: List of tokens
+    """
+    tokens = []
+    position = 0
+    for match in TAG_PATTERN.finditer(content):
+        if match.start() > position:
+            tokens.append(Token(content[position:match.start()],
+                                start=position))
+        tokens.append(Token(match[2], tag=match[1], start=match.start()))
+        position = match.end()
+    if position < len(content):
+        tokens.append(Token(content[position:], start=position))
+    return tokens
+
+
+def tags(content):
+    """
+    Returns the tags in content as a set of tag names and values.
+    """
+    return {(match[1], match[2]) for match in TAG_PATTERN.finditer(content)}
+
+
+class MarkupIndex:
+    """
+    Index of the tags used by hints. Hints are identified by arbitrary
+    hashable keys, e.g. the entries of a state or paths and item IDs.
+    Updating a hint only changes the index for the tags it added or removed.
+    """
+
+    def __init__(self):
+        self._uses = dict()
+        self._tags = dict()
+
+    def update(self, key, content):
+        old_tags = self._tags.get(key, set())
+        new_tags = tags(content)
+        for tag in old_tags - new_tags:
+            self._uses[tag].discard(key)
+            if len(self._uses[tag]) == 0:
+                self._uses.pop(tag)
+        for tag in new_tags - old_tags:
+            self._uses.setdefault(tag, set()).add(key)
+        if len(new_tags) > 0:
+            self._tags[key] = new_tags
+        else:
+            self._tags.pop(key, None)
+
+    def remove(self, key):
+        self.update(key, "")
+
+    def clear(self):
+        self._uses.clear()
+        self._tags.clear()
+
+    def uses(self, value, tag="glossary"):
+        """
+        Returns the keys of all hints using a tag with the given value.
+        """
+        return set(self._uses.get((tag, value), set()))
+
+    def values(self, tag="glossary"):
+        """
+        Returns the values used for a tag and their number of uses.
+        """
+        return {value: len(keys) for (name, value), keys in self._uses.items()
+                if name == tag}
+
+    def unknown_tags(self, known_tags=KNOWN_TAGS):
+        """
+        Returns all tags not supported by the platform and the keys of
+        the hints using them.
+        """
+        return {tag: set(keys) for tag, keys in self._uses.items() if
+                tag[0] not in known_tags}
+
+
+def index_files(paths):
+    """
+    Indexes the hints of several files, keyed by path and item ID.
+
+    :param paths: Paths to hints files or directories containing them
+    :return: MarkupIndex of all files
+    """
+    from hintstool.gui import YAMLParser, open_hints_file
+
+    index = MarkupIndex()
+    for path in hints_files(paths):
+        with open_hints_file(path) as stream:
+            for item_id, item in YAMLParser.iter_items(stream):
+                if isinstance(item, dict) and \
+                        isinstance(item.get("content"), str):
+                    index.update((str(path), item_id), item["content"])
+    return index
+
+
+def hints_files(paths):
+    """
+    Lists the hints files, including compressed ones, in the given
+    directories. Paths of files are kept.
+    """
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted({found for pattern in HINTS_FILE_PATTERNS
+                               for found in path.glob("**/" + pattern)})
+        else:
+            yield path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Search and check the markup of hints files")
+    parser.add_argument("command", choices=["find", "lint"],
+                        help="Find uses of a value or list unknown tags")
+    parser.add_argument("paths", type=str, nargs="+",
+                        help="Hints files or directories")
+    parser.add_argument("--value", type=str, default=None,
+                        help="Value to find, e.g. a glossary term")
+    parser.add_argument("--tag", type=str, default="glossary",
+                        help="Tag of the value to find")
+    args = parser.parse_args()
+
+    markup_index = index_files(args.paths)
+    if args.command == "find":
+        if args.value is None:
+            parser.error("find requires --value")
+        for path, item_id in sorted(markup_index.uses(args.value, args.tag)):
+            print("{}: {}".format(path, item_id))
+    else:
+        unknown_tags = markup_index.unknown_tags()
+        for (tag, value), keys in sorted(unknown_tags.items()):
+            for path, item_id in sorted(keys):
+                print("{}: {} unknown tag {}<{}/>".format(path, item_id, tag,
+                                                         value))
+        if len(unknown_tags) > 0:
+            raise SystemExit(1)
@@ -0,0 +1,313 @@
+import argparse
+import json
+import queue
+import socketserver
+import threading
+from contextlib import contextmanager
+
+from hintstool.gui import DEFAULT_LENGTH, DEFAULT_PREFIX, EntryType, State
+
+"""
+    Local JSON-RPC 2.0 server to change the hints of an open state from
+    other processes, e.g. scripts that create many hints at once.
+
+    Requests are sent as one JSON object or batch array per line over TCP to
+    localhost. They are collected by the connection threads and executed
+    together by the thread that owns the state, either the event loop of the
+    GUI or the loop of the headless server, so the state is never changed by
+    two threads at the same time.
+
+    Methods, entry types are given as "question" or "answer":
+    list(type), get(type, id), create(type, prefix, length),
+    edit(type, id, content), link(type, id, next_id),
+    unlink(type, id, next_id), remove(type, id),
+    reachable(type, id, backward), stats(), save()
+
+    The server does not authenticate its clients, so save only writes the
+    opened file and never a path given by the request.
+"""
+
+DEFAULT_SERVER_PORT = 4711
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+
+class RequestError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class PendingRequest:
+    """
+    Request waiting to be executed by the thread owning the state.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.response = None
+        self.done = threading.Event()
+
+
+class StateServer:
+    """
+    Serves the operations of a state on a local port. Requests are only
+    executed by process_pending, which has to be called by the thread
+    owning the state. on_request is called from the connection threads once
+    requests are waiting, e.g. to wake up the GUI event loop.
+    """
+
+    def __init__(self, state, port=DEFAULT_SERVER_PORT, on_request=None):
+        self.state = state
+        self.on_request = on_request
+        self.pending = queue.Queue()
+        self._wake_lock = threading.Lock()
+        self._woken = False
+        self.server = _Server(("127.0.0.1", port), _Handler)
+        self.server.state_server = self
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever,
+                                        daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def submit(self, request):
+        """
+        Queues a parsed request and returns its pending response.
+        """
+        pending = PendingRequest(request)
+        self.pending.put(pending)
+        with self._wake_lock:
+            wake = not self._woken
+            self._woken = True
+        if wake and self.on_request is not None:
+            self.on_request()
+        return pending
+
+    def process_pending(self, timeout=0):
+        """
+        Executes all waiting requests as one batch.
+
+        :param timeout: Seconds to wait for the first request
+        :return: Number of executed requests
+        """
+        with self._wake_lock:
+            self._woken = False
+        batch = []
+        try:
+            batch.append(self.pending.get(timeout=timeout) if timeout > 0
+                         else self.pending.get_nowait())
+            while True:
+                batch.append(self.pending.get_nowait())
+        except queue.Empty:
+            pass
+        for pending in batch:
+            try:
+                pending.response = self.execute(pending.request)
+            except Exception as error:
+                pending.response = error_response(None, INTERNAL_ERROR,
+                                                  repr(error))
+            finally:
+                pending.done.set()
+        return len(batch)
+
+    def execute(self, request):
+        """
+        Executes a single request or a batch of requests.
+
+        :return: JSON-RPC response, None for notifications
+        """
+        if isinstance(request, list):
+            if len(request) == 0:
+                return error_response(None, INVALID_REQUEST, "Empty batch")
+            responses = [self.execute(single) for single in request]
+            return [response for response in responses if response is not None]
+
+        request_id = request.get("id") if isinstance(request, dict) else None
+        try:
+            if not isinstance(request, dict) or \
+                    not isinstance(request.get("method"), str):
+                raise RequestError(INVALID_REQUEST, "Invalid request")
+            method = getattr(self, "rpc_" + request["method"], None)
+            if method is None:
+                raise RequestError(METHOD_NOT_FOUND, request["method"])
+            params = request.get("params", {})
+            try:
+                if isinstance(params, list):
+                    result = method(*params)
+                else:
+                    result = method(**params)
+            except (TypeError, ValueError, KeyError) as error:
+                raise RequestError(INVALID_PARAMS, repr(error))
+            except Exception as error:
+                # Errors of a request must not stop the thread owning the state
+                raise RequestError(INTERNAL_ERROR, repr(error))
+        except RequestError as error:
+            return error_response(request_id, error.code, error.message)
+        if "id" not in request:
+            return None
+        return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+    def rpc_list(self, type):
+        return [entry_to_dict(entry) for entry in
+                self.state.get_content(EntryType.from_str(type))]
+
+    def rpc_get(self, type, id):
+        return entry_to_dict(self._find(type, id))
+
+    def rpc_create(self, type, prefix=DEFAULT_PREFIX, length=DEFAULT_LENGTH):
+        entry = self.state.create_entry(prefix, int(length),
+                                        EntryType.from_str(type))
+        return entry_to_dict(entry)
+
+    def rpc_edit(self, type, id, content):
+        entry = self._find(type, id)
+        self.state.update_content(str(content), entry)
+        return entry_to_dict(entry)
+
+    def rpc_link(self, type, id, next_id):
+        entry = self._find(type, id)
+        with selecting(self.state, entry):
+            self.state.add_next_entry(str(next_id))
+        return entry_to_dict(entry)
+
+    def rpc_unlink(self, type, id, next_id):
+        entry = self._find(type, id)
+        with selecting(self.state, entry):
+            self.state.remove_next_entry([entry.next_entries.index(next_id)])
+        return entry_to_dict(entry)
+
+    def rpc_remove(self, type, id):
+        entry = self._find(type, id)
+        with selecting(self.state, entry):
+            self.state.remove_entry()
+        return True
+
+    def rpc_reachable(self, type, id, backward=False):
+        entry = self._find(type, id)
+        return [entry_to_dict(other) for other in
+                self.state.reachable(entry, backward=bool(backward))]
+
+    def rpc_stats(self):
+        return self.state.memory_report()
+
+    def rpc_save(self):
+        self.state.save_to_file()
+        return str(self.state.path)
+
+    def _find(self, type, id):
+        return self.state.entries[EntryType.from_str(type)].entry_mapping[id]
+
+
+@contextmanager
+def selecting(state, entry):
+    """
+    Temporarily selects an entry to use the operations of the state on it.
+    The previous selection is restored, unless that entry has been removed.
+    """
+    selected = state.selected_entry
+    state.selected_entry = entry
+    try:
+        yield entry
+    finally:
+        manager = state.entries[selected.get_entry_type()] \
+            if selected is not None else None
+        if manager is not None and \
+                manager.entry_mapping.get(selected.entry_id) is selected:
+            state.selected_entry = selected
+        else:
+            state.selected_entry = None
+
+
+def entry_to_dict(entry):
+    return {"type": "question" if entry.get_entry_type() == EntryType.QUESTION
+            else "answer",
+            "item_id": entry.item_id, "id": entry.entry_id,
+            "next": list(entry.next_entries), "content": entry.content}
+
+
+def error_response(request_id, code, message):
+    return {"jsonrpc": "2.0", "id": request_id,
+            "error": {"code": code, "message": message}}
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    Reads requests of a connection without waiting for their responses,
+    so requests sent at once are executed in the same batch. The responses
+    are written in order by a separate thread.
+    """
+
+    def handle(self):
+        responses = queue.Queue()
+        writer = threading.Thread(target=self._write, args=(responses,),
+                                  daemon=True)
+        writer.start()
+        for line in self.rfile:
+            if line.strip() == b"":
+                continue
+            try:
+                request = json.loads(line.decode("utf-8"))
+            except ValueError as error:
+                responses.put(error_response(None, PARSE_ERROR, repr(error)))
+                continue
+            responses.put(self.server.state_server.submit(request))
+        responses.put(None)
+        writer.join()
+
+    def _write(self, responses):
+        while True:
+            response = responses.get()
+            if response is None:
+                return
+            if isinstance(response, PendingRequest):
+                response.done.wait()
+                response = response.response
+            if response is None or response == []:
+                continue
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def serve(state, port=DEFAULT_SERVER_PORT):
+    """
+    Runs the server without a window until interrupted.
+    """
+    server = StateServer(state, port).start()
+    print("Serving {} on port {}".format(state.path, server.port))
+    try:
+        while True:
+            server.process_pending(timeout=0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Serve a hints file to other processes")
+    parser.add_argument("path", type=str, help="Path to the hints file")
+    parser.add_argument("--port", type=int, default=DEFAULT_SERVER_PORT,
+                        help="Local port to listen on")
+    args = parser.parse_args()
+
+    state = State(path=args.path)
+    state.load_from_file()
+    serve(state, args.port)
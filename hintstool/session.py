@@ -0,0 +1,335 @@
+import argparse
+import json
+import time
+from collections import Counter
+
+from hintstool.gui import DEFAULT_LENGTH, DEFAULT_PREFIX, LOAD_EVENT, \
+    SAVE_ERROR_EVENT, SERVER_EVENT, WORKSPACE_EVENT, State, event_loop, \
+    update_window
+
+"""
+    Records sessions of the editor as event traces and replays them without
+    a window to measure how long the events take.
+
+    A trace is a JSON lines file. The first line names the hints file, every
+    further line contains an event, the seconds since the start of the
+    session and the elements of the window that have changed since the last
+    event: the selected indexes of lists and the values of inputs.
+
+    The replayer runs the traces through the event loop of the editor with
+    a FakeWindow, which counts the calls of the elements and the number of
+    items and characters that would have been rendered.
+"""
+
+TRACE_VERSION = 1
+LIST_KEYS = ("question_list", "answer_list", "follow", "follow_order",
+             "similar", "id_suggestions")
+INPUT_KEYS = ("prefix", "prefix_length", "textbox", "other_id",
+              "highlight_reachable", "show_similar")
+DEFAULT_VALUES = {"prefix": DEFAULT_PREFIX,
+                  "prefix_length": str(DEFAULT_LENGTH),
+                  "other_id": "prefexample001",
+                  "highlight_reachable": False, "show_similar": False}
+# Events posted by worker threads, which cannot be repeated from a trace
+INTERNAL_EVENTS = (LOAD_EVENT, SAVE_ERROR_EVENT, SERVER_EVENT,
+                   WORKSPACE_EVENT)
+# Events opening dialogs or writing files are not replayed
+DIALOG_EVENTS = ("Open", "Save", "Extract reachable")
+
+
+class FakeWidget:
+    """
+    Replaces the tkinter widget of an element, e.g. to color list items.
+    """
+
+    def __init__(self, element):
+        self.element = element
+
+    def itemconfig(self, index, **options):
+        self.element.window.count(self.element.key, "itemconfig")
+
+    def configure(self, **options):
+        self.element.window.count(self.element.key, "configure")
+
+
+class FakeElement:
+    """
+    Element of a FakeWindow, which keeps the shown values instead of
+    rendering them. Lists keep their values and selected indexes, all other
+    elements a single value.
+    """
+
+    def __init__(self, window, key):
+        self.window = window
+        self.key = key
+        self.is_list = key in LIST_KEYS
+        self.value = DEFAULT_VALUES.get(key, "")
+        self.values = []
+        self.indexes = []
+        self.options = dict()
+        self.Widget = FakeWidget(self)
+
+    def update(self, value=None, set_to_index=None, **options):
+        self.window.count(self.key, "update")
+        if value is not None:
+            if self.is_list:
+                self.values = list(value)
+                self.indexes = []
+                self.window.rendered(len(self.values), sum(
+                    len(str(item)) for item in self.values))
+            else:
+                self.value = value
+                self.window.rendered(1, len(str(value)))
+        if set_to_index is not None:
+            self.indexes = [set_to_index] if isinstance(set_to_index, int) \
+                else list(set_to_index)
+        self.options.update(options)
+
+    def get(self):
+        self.window.count(self.key, "get")
+        if self.is_list:
+            return [self.values[index] for index in self.indexes if
+                    index < len(self.values)]
+        return self.value
+
+    def get_indexes(self):
+        self.window.count(self.key, "get_indexes")
+        return tuple(self.indexes)
+
+
+class EventTiming:
+    """
+    Measurements of a replayed event.
+    """
+
+    def __init__(self, event, seconds, calls, items, characters):
+        self.event = event
+        self.seconds = seconds
+        self.calls = calls
+        self.items = items
+        self.characters = characters
+
+    def __str__(self):
+        return "{:<20} {:9.2f} ms {:5} calls {:8} items {:10} chars".format(
+            self.event, self.seconds * 1000, sum(self.calls.values()),
+            self.items, self.characters)
+
+
+class FakeWindow:
+    """
+    Window without a GUI, which returns the events of a trace from read.
+    The time between reading an event and reading the next one is measured
+    as the time needed for the event.
+    """
+
+    def __init__(self, records=()):
+        self.records = list(records)
+        self.position = 0
+        self.elements = dict()
+        self.timings = []
+        self.skipped = []
+        self.calls = Counter()
+        self.items = 0
+        self.characters = 0
+        self._event = None
+        self._start = None
+
+    def count(self, key, method):
+        self.calls[(key, method)] += 1
+
+    def rendered(self, items, characters):
+        self.items += items
+        self.characters += characters
+
+    def read(self, timeout=None):
+        self._finish_event()
+        while self.position < len(self.records):
+            record = self.records[self.position]
+            self.position += 1
+            event = record["event"]
+            if event is not None and any(name in event for name in
+                                         DIALOG_EVENTS):
+                self.skipped.append(event)
+                continue
+            self._apply(record.get("elements", {}))
+            values = {key: element.get() for key, element in
+                      self.elements.items()}
+            if event is not None:
+                self._start_event(event)
+            return event, values
+        return None, None
+
+    def refresh(self):
+        self.count(None, "refresh")
+        return self
+
+    def finalize(self):
+        return self
+
+    def write_event_value(self, key, value):
+        pass
+
+    def close(self):
+        pass
+
+    def __getitem__(self, key):
+        element = self.elements.get(key)
+        if element is None:
+            element = self.elements[key] = FakeElement(self, key)
+        return element
+
+    def _apply(self, elements):
+        for key, recorded in elements.items():
+            if "indexes" in recorded:
+                self[key].indexes = list(recorded["indexes"])
+            else:
+                self[key].value = recorded["value"]
+
+    def _start_event(self, event):
+        self.calls = Counter()
+        self.items = 0
+        self.characters = 0
+        self._event = event
+        self._start = time.perf_counter()
+
+    def _finish_event(self):
+        if self._event is None:
+            return
+        self.timings.append(EventTiming(
+            self._event, time.perf_counter() - self._start, self.calls,
+            self.items, self.characters))
+        self._event = None
+
+
+class SessionRecorder:
+    """
+    Wraps a window to write its events to a trace file while the editor is
+    used. All other attributes are those of the window.
+    """
+
+    def __init__(self, window, path, hints_path=None):
+        self.window = window
+        self.stream = open(path, "w", encoding="utf-8")
+        self._recorded = dict()
+        self._start = time.monotonic()
+        self._write({"version": TRACE_VERSION,
+                     "path": None if hints_path is None else str(hints_path)})
+
+    def read(self, *args, **kwargs):
+        event, values = self.window.read(*args, **kwargs)
+        if event not in INTERNAL_EVENTS:
+            self._record(event)
+        return event, values
+
+    def close(self):
+        self.stream.close()
+        self.window.close()
+
+    def __getitem__(self, key):
+        return self.window[key]
+
+    def __getattr__(self, name):
+        return getattr(self.window, name)
+
+    def _record(self, event):
+        elements = dict()
+        if event is not None:
+            current = {key: {"indexes": list(self.window[key].get_indexes())}
+                       for key in LIST_KEYS}
+            current.update((key, {"value": self.window[key].get()}) for key
+                           in INPUT_KEYS)
+            elements = {key: recorded for key, recorded in current.items() if
+                        self._recorded.get(key) != recorded}
+            self._recorded.update(elements)
+        self._write({"event": event,
+                     "time": round(time.monotonic() - self._start, 3),
+                     "elements": elements})
+
+    def _write(self, line):
+        self.stream.write(json.dumps(line) + "\n")
+        self.stream.flush()
+
+
+def read_trace(path):
+    """
+    Reads a trace file.
+
+    :return: Path of the hints file or None and list of event records
+    """
+    with open(path, encoding="utf-8") as stream:
+        lines = [json.loads(line) for line in stream if line.strip() != ""]
+    if len(lines) == 0 or lines[0].get("version") != TRACE_VERSION:
+        raise ValueError("Unsupported trace {}".format(path))
+    return lines[0].get("path"), lines[1:]
+
+
+def replay(state, records):
+    """
+    Runs recorded events through the event loop with a FakeWindow.
+
+    :param state: State to change, usually with the hints of the recording
+    :param records: Event records of a trace
+    :return: The FakeWindow with the timings of the events
+    """
+    window = FakeWindow(records)
+    update_window(state, window,
+                  ["answer_list", "question_list", "textbox", "follow",
+                   "follow_order"])
+    event_loop(state, window)
+    return window
+
+
+def replay_file(trace_path, hints_path=None):
+    """
+    Replays a trace with the hints of the recording or another hints file,
+    e.g. a large generated one. Changes are not saved.
+
+    :return: The FakeWindow with the timings of the events
+    """
+    recorded_path, records = read_trace(trace_path)
+    state = State(path=hints_path or recorded_path, auto_save=False)
+    state.load_from_file()
+    return replay(state, records)
+
+
+def summarize(timings):
+    """
+    Groups the timings by event.
+
+    :return: Dictionary of events to their number, total and maximal
+    seconds and rendered items
+    """
+    summary = dict()
+    for timing in timings:
+        count, total, longest, items = summary.get(timing.event, (0, 0, 0, 0))
+        summary[timing.event] = (count + 1, total + timing.seconds,
+                                 max(longest, timing.seconds),
+                                 items + timing.items)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay a recorded session without a window")
+    parser.add_argument("trace", type=str, help="Path to the trace file")
+    parser.add_argument("--path", type=str, default=None,
+                        help="Hints file to use instead of the recorded one")
+    parser.add_argument("--events", action="store_true",
+                        help="Print the timing of every event")
+    args = parser.parse_args()
+
+    replayed = replay_file(args.trace, args.path)
+    if args.events:
+        for event_timing in replayed.timings:
+            print(event_timing)
+        print()
+    print("{:<20} {:>6} {:>12} {:>12} {:>10}".format(
+        "event", "count", "mean ms", "max ms", "items"))
+    for name, (number, seconds, maximum, rendered) in sorted(
+            summarize(replayed.timings).items(),
+            key=lambda item: -item[1][1]):
+        print("{:<20} {:6} {:12.2f} {:12.2f} {:10}".format(
+            name, number, seconds / number * 1000, maximum * 1000,
+            rendered // number))
+    if len(replayed.skipped) > 0:
+        print("Skipped {} events with dialogs".format(len(replayed.skipped)))
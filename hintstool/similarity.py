@@ -0,0 +1,187 @@
+import argparse
+import operator
+import random
+import re
+import zlib
+
+"""
+    Detection of near-duplicate hints. Contents are split into overlapping
+    character shingles, whose Jaccard similarity is estimated by MinHash
+    signatures. Locality-sensitive hashing puts signatures that agree in a
+    whole band into the same bucket, so only hints sharing a bucket are
+    compared instead of all pairs. To find groups of similar hints, every
+    hint is only compared to the first hint of its buckets, which keeps the
+    search near-linear even for large groups like many answers "Ja".
+"""
+
+SHINGLE_LENGTH = 4
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+DEFAULT_THRESHOLD = 0.5
+MERSENNE_PRIME = (1 << 61) - 1
+WHITESPACE = re.compile(r"\s+")
+
+_random = random.Random(1)
+PERMUTATIONS = [(_random.randrange(1, MERSENNE_PRIME),
+                 _random.randrange(0, MERSENNE_PRIME)) for _ in
+                range(NUM_PERMUTATIONS)]
+
+
+def shingles(content, length=SHINGLE_LENGTH):
+    """
+    Returns the hashes of all substrings of the given length of the
+    normalized content. Shorter contents are a single shingle.
+    """
+    content = WHITESPACE.sub(" ", content.lower()).strip()
+    if len(content) <= length:
+        return {zlib.crc32(content.encode("utf-8"))}
+    return {zlib.crc32(content[i:i + length].encode("utf-8")) for i in
+            range(len(content) - length + 1)}
+
+
+def signature(content):
+    """
+    Computes the MinHash signature of the content.
+    """
+    content_shingles = shingles(content)
+    return tuple(min((a * shingle + b) % MERSENNE_PRIME for shingle in
+                     content_shingles) for a, b in PERMUTATIONS)
+
+
+def similarity(signature_1, signature_2):
+    """
+    Estimates the Jaccard similarity of two contents from their signatures.
+    """
+    if signature_1 is signature_2:
+        return 1
+    return sum(map(operator.eq, signature_1, signature_2)) / len(signature_1)
+
+
+class SimilarityIndex:
+    """
+    Caches the signatures of hints and their LSH buckets. Hints are
+    identified by arbitrary hashable keys. Updating a hint only recomputes
+    its signature if the content has changed, identical contents share
+    their signature.
+    """
+
+    def __init__(self, num_bands=NUM_BANDS):
+        self.rows = NUM_PERMUTATIONS // num_bands
+        self._signatures = dict()
+        self._buckets = dict()
+        self._content_signatures = dict()
+
+    def update(self, key, content):
+        cached = self._signatures.get(key)
+        if cached is not None and cached[0] == content:
+            return
+        self.remove(key)
+        shared = self._content_signatures.get(content)
+        if shared is None:
+            shared = self._content_signatures[content] = [signature(content),
+                                                          0]
+        shared[1] += 1
+        key_signature = shared[0]
+        self._signatures[key] = (content, key_signature)
+        for band in self._bands(key_signature):
+            # Dictionaries keep the order in which hints were added
+            self._buckets.setdefault(band, dict())[key] = None
+
+    def remove(self, key):
+        cached = self._signatures.pop(key, None)
+        if cached is None:
+            return
+        shared = self._content_signatures[cached[0]]
+        shared[1] -= 1
+        if shared[1] == 0:
+            self._content_signatures.pop(cached[0])
+        for band in self._bands(cached[1]):
+            self._buckets[band].pop(key)
+            if len(self._buckets[band]) == 0:
+                self._buckets.pop(band)
+
+    def similar(self, key, threshold=DEFAULT_THRESHOLD):
+        """
+        Finds the hints similar to the hint with the given key.
+
+        :return: List of keys and estimated similarities,
+        most similar first
+        """
+        key_signature = self._signatures[key][1]
+        candidates = set()
+        for band in self._bands(key_signature):
+            candidates.update(self._buckets[band])
+        candidates.discard(key)
+        found = []
+        for candidate in candidates:
+            estimate = similarity(key_signature,
+                                  self._signatures[candidate][1])
+            if estimate >= threshold:
+                found.append((candidate, estimate))
+        found.sort(key=lambda result: -result[1])
+        return found
+
+    def groups(self, threshold=DEFAULT_THRESHOLD, partition=None):
+        """
+        Finds groups of similar hints. Hints are grouped if they are similar
+        to the first hint of a shared bucket, so not all hints of a group
+        have to be similar to each other.
+
+        :param threshold: Minimal estimated similarity between 0 and 1
+        :param partition: Optional function returning the partition of a key,
+        only keys of the same partition are grouped, e.g. hints of one type
+        :return: List of groups as lists of keys, in the order they were added
+        """
+        parents = dict()
+
+        def find(key):
+            root = key
+            while root in parents and parents[root] != root:
+                root = parents[root]
+            while key != root:
+                parents[key], key = root, parents[key]
+            return root
+
+        for bucket in self._buckets.values():
+            firsts = dict()
+            for key in bucket:
+                first = firsts.setdefault(
+                    None if partition is None else partition(key), key)
+                if first == key:
+                    continue
+                first_root, key_root = find(first), find(key)
+                if first_root != key_root and similarity(
+                        self._signatures[first][1],
+                        self._signatures[key][1]) >= threshold:
+                    parents[first_root] = first_root
+                    parents[key_root] = first_root
+
+        groups = dict()
+        for key in self._signatures:
+            if key in parents:
+                groups.setdefault(find(key), []).append(key)
+        return list(groups.values())
+
+    def _bands(self, key_signature):
+        return [(index, key_signature[start:start + self.rows]) for
+                index, start in
+                enumerate(range(0, len(key_signature), self.rows))]
+
+    def __contains__(self, key):
+        return key in self._signatures
+
+
+if __name__ == "__main__":
+    from hintstool.gui import State
+
+    parser = argparse.ArgumentParser(
+        description="Find near-duplicate hints in a hints file")
+    parser.add_argument("path", type=str, help="Path to the hints file")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Minimal estimated similarity between 0 and 1")
+    args = parser.parse_args()
+
+    state = State(path=args.path)
+    state.load_from_file()
+    for group in state.similar_groups(args.threshold):
+        print(" ".join(entry.item_id for entry in group))
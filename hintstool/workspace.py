@@ -0,0 +1,272 @@
+import argparse
+import io
+import json
+import lzma
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import yaml
+from pathlib2 import Path
+
+from hintstool.gui import EntryType, YAMLParser, open_hints_file
+from hintstool.markup import hints_files
+
+"""
+    Index of the hints of all files in a directory tree, so IDs of other
+    files can be resolved without opening them.
+
+    The index maps the IDs of questions and answers to their file, item ID
+    and the byte offset of their item in the file, counted in the
+    decompressed content for compressed files. It is stored as JSON in the
+    root directory and refreshed incrementally: only files with a changed
+    modification time or size are parsed again, in parallel by a pool of
+    processes.
+"""
+
+INDEX_NAME = ".hintsindex.json"
+INDEX_VERSION = 1
+
+
+class Location:
+    """
+    Position of an entry in a file of the workspace.
+    """
+
+    def __init__(self, path, item_id, entry_type, entry_id, offset):
+        self.path = Path(path)
+        self.item_id = item_id
+        self.entry_type = entry_type
+        self.entry_id = entry_id
+        self.offset = offset
+
+    def __eq__(self, other):
+        return isinstance(other, Location) and (
+            self.path, self.item_id, self.entry_type, self.entry_id,
+            self.offset) == (other.path, other.item_id, other.entry_type,
+                             other.entry_id, other.offset)
+
+    def __str__(self):
+        return "{} ({})".format(self.entry_id, self.path.name)
+
+    def __repr__(self):
+        return "Location({!r}, {!r}, {}, {!r}, {})".format(
+            str(self.path), self.item_id, self.entry_type, self.entry_id,
+            self.offset)
+
+
+def scan_file(path):
+    """
+    Finds the entries of a hints file and the byte offsets of their items.
+    Runs in the worker processes, so only plain values are returned.
+
+    :param path: Path to the hints file
+    :return: List of entry type, entry ID, item ID and offset of each entry
+    and an error message or None
+    """
+    records = []
+    try:
+        with open_hints_file(path, "rb") as raw:
+            text = raw.read().decode("utf-8")
+        char_offset = 0
+        byte_offset = 0
+        for item_id, item, index in YAMLParser.iter_items_with_offsets(
+                io.StringIO(text)):
+            entry = YAMLParser.create_entry_from_yaml(item_id, item)
+            if entry is None:
+                continue
+            # Items are read from the start of their line, including the "- "
+            line_start = text.rfind("\n", 0, index) + 1
+            byte_offset += len(text[char_offset:line_start].encode("utf-8"))
+            char_offset = line_start
+            records.append([entry.get_entry_type().name.lower(),
+                            entry.entry_id, item_id, byte_offset])
+    except (OSError, EOFError, lzma.LZMAError, UnicodeDecodeError,
+            yaml.YAMLError) as error:
+        return records, repr(error)
+    return records, None
+
+
+class WorkspaceIndex:
+    """
+    Persistent index of the entries of all hints files below a directory.
+    Entries are found by their type and ID, an ID can be used by several
+    files.
+    """
+
+    def __init__(self, root, index_path=None):
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path is not None \
+            else self.root / INDEX_NAME
+        # Relative path of each file to its modification time, size and
+        # entry records
+        self.files = dict()
+        self._locations = {EntryType.QUESTION: dict(),
+                           EntryType.ANSWER: dict()}
+
+    def load(self):
+        """
+        Reads the stored index. Missing or outdated indices are ignored,
+        so the next refresh scans all files.
+
+        :return: The index
+        """
+        try:
+            with self.index_path.open(encoding="utf-8") as stream:
+                stored = json.load(stream)
+        except (OSError, ValueError):
+            return self
+        if isinstance(stored, dict) and \
+                stored.get("version") == INDEX_VERSION:
+            self.files = stored["files"]
+            self._build()
+        return self
+
+    def save(self):
+        """
+        Writes the index, replacing the stored index only once it has been
+        written completely.
+        """
+        temporary = self.index_path.with_name(self.index_path.name + ".tmp")
+        with temporary.open("w", encoding="utf-8") as stream:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, stream)
+        os.replace(str(temporary), str(self.index_path))
+
+    def refresh(self, processes=None):
+        """
+        Scans all new and changed files and removes deleted files.
+        Several files are scanned in parallel by separate processes.
+
+        :param processes: Number of processes, all cores by default and
+        no separate process if 1
+        :return: List of the scanned and list of the removed relative paths
+        """
+        current = dict()
+        for path in hints_files([self.root]):
+            stat = path.stat()
+            current[path.relative_to(self.root).as_posix()] = (
+                stat.st_mtime_ns, stat.st_size)
+        removed = [name for name in self.files if name not in current]
+        for name in removed:
+            self.files.pop(name)
+        changed = [name for name, (mtime, size) in current.items() if
+                   name not in self.files or
+                   self.files[name]["mtime"] != mtime or
+                   self.files[name]["size"] != size]
+
+        paths = [str(self.root / name) for name in changed]
+        if processes == 1 or len(paths) <= 1:
+            results = map(scan_file, paths)
+            self._apply(changed, current, results)
+        else:
+            # Forking is not safe in the threads of the GUI, and there are
+            # never more processes than files to scan
+            workers = min(processes or os.cpu_count() or 1, len(paths))
+            with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn")) as \
+                    executor:
+                self._apply(changed, current,
+                            executor.map(scan_file, paths, chunksize=1))
+        self._build()
+        return changed, removed
+
+    def find(self, entry_type, entry_id):
+        """
+        Returns the locations of all entries of a type with the given ID.
+        """
+        return list(self._locations[entry_type].get(entry_id, []))
+
+    def ids(self, entry_type):
+        """
+        Returns all IDs of the given type in the workspace.
+        """
+        return list(self._locations[entry_type])
+
+    def read_entry(self, location):
+        """
+        Reads a single entry from its file without parsing the rest of it.
+        If the file has changed since indexing, the item is searched in the
+        whole file.
+
+        :param location: Location of the entry
+        :return: The entry or None if it does not exist anymore
+        """
+        with open_hints_file(location.path, "rb") as raw:
+            # Compressed files are decompressed up to the offset
+            raw.seek(location.offset)
+            stream = io.TextIOWrapper(raw, encoding="utf-8")
+            try:
+                for item_id, item in YAMLParser.iter_items(stream):
+                    if item_id == location.item_id:
+                        return YAMLParser.create_entry_from_yaml(item_id,
+                                                                 item)
+                    break
+            except (UnicodeDecodeError, yaml.YAMLError):
+                pass
+        with open_hints_file(location.path) as stream:
+            for item_id, item in YAMLParser.iter_items(stream):
+                if item_id == location.item_id:
+                    return YAMLParser.create_entry_from_yaml(item_id, item)
+        return None
+
+    def __len__(self):
+        return sum(len(record["entries"]) for record in self.files.values())
+
+    def _apply(self, names, current, results):
+        for name, (records, error) in zip(names, results):
+            if error is not None:
+                print("Could not index {}: {}".format(name, error))
+            mtime, size = current[name]
+            # Files with errors are kept, so they are only scanned again
+            # once they have been changed
+            self.files[name] = {"mtime": mtime, "size": size,
+                                "entries": records}
+
+    def _build(self):
+        for locations in self._locations.values():
+            locations.clear()
+        for name, record in self.files.items():
+            path = self.root / name
+            for entry_type, entry_id, item_id, offset in record["entries"]:
+                entry_type = EntryType.from_str(entry_type)
+                self._locations[entry_type].setdefault(entry_id, []).append(
+                    Location(path, item_id, entry_type, entry_id, offset))
+
+
+def open_workspace(root, processes=None):
+    """
+    Loads the stored index of a workspace, refreshes and stores it again.
+
+    :param root: Root directory of the workspace
+    :param processes: Number of processes to scan changed files
+    :return: The refreshed WorkspaceIndex
+    """
+    workspace = WorkspaceIndex(root).load()
+    changed, removed = workspace.refresh(processes)
+    if len(changed) > 0 or len(removed) > 0 or \
+            not workspace.index_path.is_file():
+        workspace.save()
+    return workspace
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Index the hints files of a directory")
+    parser.add_argument("root", type=str, help="Root directory of the hints")
+    parser.add_argument("--find", type=str, default=None,
+                        help="ID to find in the workspace")
+    parser.add_argument("--processes", type=int, default=None,
+                        help="Number of processes to scan the files")
+    args = parser.parse_args()
+
+    workspace_index = open_workspace(args.root, args.processes)
+    if args.find is None:
+        print("Indexed {} hints in {} files".format(
+            len(workspace_index), len(workspace_index.files)))
+    else:
+        for found_type in EntryType:
+            for found in workspace_index.find(found_type, args.find):
+                print("{}: {} ({} {})".format(
+                    found.path, found.item_id, found.entry_type.name.lower(),
+                    found.entry_id))
@@ -1,8 +1,24 @@
+import json
+import queue
+import shutil
+import socket
+import threading
 import unittest
 
 from pathlib2 import Path
 
-from hintstool.gui import State, EntryType
+from hintstool.diff import ChangeType, NotSortedError, diff, diff_entries, \
+    iter_entries, merge_entries, patch
+from hintstool.export import compile_state, export, load_artifact
+from hintstool.gui import Answer, IdIndex, LoadBatch, State, EntryType, \
+    event_loop
+from hintstool.importer import import_file, import_rows
+from hintstool.markup import Token, index_files, tokenize
+from hintstool.server import StateServer
+from hintstool.session import FakeWindow, SessionRecorder, read_trace, \
+    replay
+from hintstool.similarity import SimilarityIndex, signature, similarity
+from hintstool.workspace import WorkspaceIndex, open_workspace
 
 
 class TestEntryType(unittest.TestCase):
@@ -70,6 +86,120 @@ class TestLoadingFunctions(unittest.TestCase):
         assert str(self.state.path) == "backup.yml"
 
 
+class TestBackgroundLoading(unittest.TestCase):
+    def setUp(self):
+        self.state = State()
+        self.batches = queue.Queue()
+
+    def test_load_in_background(self):
+        self.state.load_in_background("resources/hints_test.yml",
+                                      self.batches.put)
+        while self.state.is_loading():
+            batch = self.batches.get(timeout=5)
+            assert self.state.apply_loaded(batch)
+        assert batch.done
+        assert batch.progress == 1
+        assert_num_entries(self.state, 4, 3)
+        assert str(self.state.path) == str(Path("resources/hints_test.yml"))
+        assert not self.state.has_unsaved_changes()
+
+    def test_edits_while_loading_unsaved(self):
+        loader = self.state.load_in_background("resources/hints_test.yml",
+                                               self.batches.put)
+        loader.cancel()
+        entries = list(iter_entries("resources/hints_test.yml"))
+        self.state.apply_loaded(LoadBatch(loader, entries[:2], 0.5))
+        self.state.update_content("Changed", entries[0])
+        self.state.apply_loaded(LoadBatch(loader, entries[2:], 1, done=True))
+        assert not self.state.is_loading()
+        assert self.state.has_unsaved_changes()
+
+    def test_cancel(self):
+        loader = self.state.load_in_background("resources/hints_test.yml",
+                                               self.batches.put)
+        self.state.cancel_loading()
+        loader.join(timeout=5)
+        while not self.batches.empty():
+            assert not self.state.apply_loaded(self.batches.get())
+        assert str(self.state.path) == "backup.yml"
+
+    def test_partial_load(self):
+        self.state.load_from_file("resources/hints_test.yml")
+        loader = self.state.load_in_background("resources/hints_test.yml",
+                                               self.batches.put)
+        loader.cancel()
+        assert_num_entries(self.state, 0, 0)
+        entries = list(iter_entries("resources/hints_test.yml"))
+        assert self.state.apply_loaded(LoadBatch(loader, entries[:2], 0.5))
+        with self.assertRaises(RuntimeError):
+            self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        self.state.set_entry(0, EntryType.QUESTION)
+        with self.assertRaises(RuntimeError):
+            self.state.add_next_entry("prefix003")
+        self.state.cancel_loading()
+        assert_num_entries(self.state, 0, 0)
+        assert str(self.state.path) == "backup.yml"
+
+    def test_failed_load_dropped(self):
+        loader = self.state.load_in_background("resources/hints_test.yml",
+                                               self.batches.put)
+        loader.cancel()
+        entries = list(iter_entries("resources/hints_test.yml"))
+        self.state.apply_loaded(LoadBatch(loader, entries[:2], 0.5))
+        self.state.apply_loaded(LoadBatch(loader, entries[2:4], 0.8,
+                                          error=OSError("broken")))
+        assert not self.state.is_loading()
+        assert_num_entries(self.state, 0, 0)
+        self.state.create_entry("prefix", 3, EntryType.ANSWER)
+
+    def test_missing_file(self):
+        self.state.load_in_background("resources/missing.yml",
+                                      self.batches.put)
+        batch = self.batches.get(timeout=5)
+        assert self.state.apply_loaded(batch)
+        assert batch.error is not None
+        assert not self.state.is_loading()
+        assert str(self.state.path) == "backup.yml"
+
+
+class TestCompressedFiles(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_save_and_load(self):
+        for path in ["resources/hints_test.yml.gz",
+                     "resources/hints_test.yml.xz"]:
+            self.state.save_to_file(path)
+            loaded = State(path=path)
+            loaded.load_from_file()
+            assert Path(path).read_bytes()[:3] != b"- i"
+            assert_num_entries(loaded, 4, 3)
+            assert diff("resources/hints_test.yml", path) == []
+            Path(path).unlink()
+
+    def test_load_in_background(self):
+        path = "resources/hints_test.yml.gz"
+        self.state.save_to_file(path)
+        batches = queue.Queue()
+        loaded = State()
+        loaded.load_in_background(path, batches.put)
+        while loaded.is_loading():
+            assert loaded.apply_loaded(batches.get(timeout=5))
+        assert_num_entries(loaded, 4, 3)
+        Path(path).unlink()
+
+    def test_workspace(self):
+        root = Path("resources/compressed")
+        root.mkdir()
+        self.state.save_to_file(str(root / "hints.yml.xz"))
+        workspace = open_workspace(root, processes=1)
+        location = workspace.find(EntryType.ANSWER, "prefix003")[0]
+        assert workspace.read_entry(location).item_id == "itemprefix006"
+        shutil.rmtree(str(root))
+
+
 class TestStateManipulation(unittest.TestCase):
     def setUp(self):
         state = State()
@@ -167,6 +297,702 @@ class TestStateManipulationWithoutSelected(TestStateManipulation):
         assert self.state.selected_entry is None
 
 
+class TestConcurrency(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_snapshot_unchanged_by_edits(self):
+        snapshot = self.state.snapshot()
+        assert self.state.snapshot() is snapshot
+        answer = get_entry_by_id(self.state, "itemprefix005")
+        self.state.update_content("Changed", answer)
+        self.state.selected_entry = answer
+        self.state.swap_next(0, 1)
+        assert self.state.snapshot() is not snapshot
+        changes = diff_entries(snapshot.entries(),
+                               self.state.snapshot().entries())
+        assert [change.change_type for change in changes] == [
+            ChangeType.MODIFIED, ChangeType.REORDERED]
+        assert diff_entries(snapshot.entries(), iter_entries(
+            "resources/hints_test.yml")) == []
+
+    def test_snapshot_kept_without_changes(self):
+        snapshot = self.state.snapshot()
+        answer = get_entry_by_id(self.state, "itemprefix005")
+        self.state.update_content(answer.content, answer)
+        self.state.selected_entry = answer
+        self.state.swap_next(0, -1)
+        self.state.swap_next(2, 3)
+        self.state.update_next([index for index, _ in self.state.get_next()])
+        self.state.set_entry(0, EntryType.QUESTION)
+        self.state.swap_next(0, 1)
+        assert self.state.snapshot() is snapshot
+        assert not self.state.has_unsaved_changes()
+
+    def test_save_in_background(self):
+        path = "resources/hints_test_background.yml"
+        self.state.save_in_background(path)
+        self.state.update_content("Changed",
+                                  get_entry_by_id(self.state, "itemprefix001"))
+        self.state.save_in_background()
+        self.state.wait_for_saving()
+        saved = State(path=path)
+        saved.load_from_file()
+        assert get_entry_by_id(saved, "itemprefix001").content == "Changed"
+        Path(path).unlink()
+
+    def test_failed_save_in_background(self):
+        path = Path("resources/hints_test_directory.yml")
+        path.mkdir()
+        self.state.update_content("Changed",
+                                  get_entry_by_id(self.state, "itemprefix001"))
+        errors = []
+        self.state.save_in_background(path, lambda *error: errors.append(
+            error))
+        self.state.wait_for_saving()
+        assert len(errors) == 1
+        assert errors[0][0] == path
+        assert isinstance(errors[0][1], OSError)
+        assert self.state.has_unsaved_changes()
+        path.rmdir()
+        # The unchanged hints are saved again once the file can be written
+        self.state.save_in_background(path)
+        self.state.wait_for_saving()
+        assert not self.state.has_unsaved_changes()
+        assert diff_entries(self.state.snapshot().entries(),
+                            iter_entries(str(path))) == []
+        path.unlink()
+
+    def test_writer_waits_for_readers(self):
+        with self.state.lock.read():
+            writer = threading.Thread(target=self.state.create_entry,
+                                      args=("prefix", 3, EntryType.ANSWER))
+            writer.start()
+            writer.join(timeout=0.1)
+            assert writer.is_alive()
+            assert_num_entries(self.state, 4, 3)
+        writer.join(timeout=5)
+        assert_num_entries(self.state, 4, 4)
+
+
+class TestSharedContents(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_identical_contents_shared(self):
+        first = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        second = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        self.state.update_content("".join(["J", "a"]), first)
+        self.state.update_content("".join(["J", "a"]), second)
+        assert first.content is second.content
+        report = self.state.memory_report()
+        assert report["saved_content_bytes"] > 0
+        assert report["unique_ids"] < report["id_references"]
+
+    def test_edit_copy_on_write(self):
+        first = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        second = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        self.state.update_content("Ja", first)
+        self.state.update_content("Ja", second)
+        self.state.update_content("Nein", first)
+        assert second.content == "Ja"
+        assert self.state.memory_report()["saved_content_bytes"] == 0
+
+    def test_removed_contents_released(self):
+        unique_contents = len(self.state.content_pool)
+        self.state.set_entry(0, EntryType.QUESTION)
+        self.state.remove_entry()
+        assert len(self.state.content_pool) == unique_contents - 1
+
+    def test_numeric_ids(self):
+        path = "resources/hints_numeric.yml"
+        Path(path).write_text("- 1:\n"
+                              "    answer_id: 1\n"
+                              "    question_options: [1, 2]\n"
+                              "    content: Answer\n"
+                              "- 2:\n"
+                              "    question_id: 1\n"
+                              "    following_answer_id: 1\n"
+                              "    content: Question\n", encoding="utf-8")
+        state = State(path=path)
+        state.load_from_file()
+        Path(path).unlink()
+        answer = get_entry_by_id(state, "1")
+        assert answer.next_entries == ["1", "2"]
+        assert get_entry_by_id(state, "2").next_entries == ["1"]
+
+    def test_ids_interned(self):
+        question = get_entry_by_id(self.state, "itemprefix001")
+        answer = get_entry_by_id(self.state, "itemprefix004")
+        assert question.next_entries[0] is answer.entry_id
+
+
+class TestIdCompletion(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_index_complete(self):
+        index = IdIndex(["b2", "a1", "b1", "c"])
+        assert index.complete("b") == ["b1", "b2"]
+        assert index.complete("b", limit=1) == ["b1"]
+        assert index.complete("d") == []
+        index.add("b1")
+        index.remove("b1")
+        assert "b1" in index
+        index.remove("b1")
+        assert index.complete("b") == ["b2"]
+
+    def test_complete_following_type(self):
+        self.state.set_entry(0, EntryType.QUESTION)
+        assert self.state.complete_id("prefix") == \
+            sorted(self.state.entries[EntryType.ANSWER].order)
+
+    def test_created_and_removed_ids(self):
+        entry = self.state.create_entry("new", 3, EntryType.ANSWER)
+        assert self.state.complete_id("new", EntryType.ANSWER) == \
+            [entry.entry_id]
+        self.state.selected_entry = entry
+        self.state.remove_entry()
+        assert self.state.complete_id("new", EntryType.ANSWER) == []
+
+    def test_external_ids(self):
+        self.state.external_ids[EntryType.ANSWER].update(["other1",
+                                                          "prefix001"])
+        assert self.state.complete_id("", EntryType.ANSWER)[:2] == [
+            "other1", "prefix001"]
+        assert self.state.complete_id("prefix001", EntryType.ANSWER) == [
+            "prefix001"]
+        assert self.state.complete_id("other", EntryType.ANSWER,
+                                      external=False) == []
+
+
+class TestMarkup(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_tokenize(self):
+        assert tokenize("See glossary<Test/>.") == [
+            Token("See ", start=0), Token("Test", tag="glossary", start=4),
+            Token(".", start=19)]
+
+    def test_find_uses(self):
+        assert [entry.item_id for entry in self.state.find_uses("Test")] == [
+            "itemprefix002"]
+        assert len(self.state.find_uses("import", tag="code")) == 1
+
+    def test_index_updated_on_edit(self):
+        # itemprefix002
+        self.state.set_entry(1, EntryType.QUESTION)
+        self.state.update_content("glossary<Other/>")
+        assert self.state.find_uses("Test") == []
+        assert self.state.find_uses("Other") == [self.state.selected_entry]
+        self.state.remove_entry()
+        assert self.state.find_uses("Other") == []
+
+    def test_index_files(self):
+        index = index_files(["resources"])
+        assert index.uses("Test") == {
+            (str(Path("resources/hints_test.yml")), "itemprefix002")}
+        assert index.unknown_tags() == {}
+
+
+class TestSimilarity(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_signature(self):
+        assert similarity(signature("Question  1"),
+                          signature("question 1")) == 1
+        assert similarity(signature("Question1"),
+                          signature("Something else")) < 0.5
+
+    def test_index(self):
+        index = SimilarityIndex()
+        index.update("a", "Welche Liste wird sortiert?")
+        index.update("b", "Welche Liste wird hier sortiert?")
+        index.update("c", "Ja")
+        assert [key for key, _ in index.similar("a")] == ["b"]
+        index.update("b", "Nein")
+        assert index.similar("a") == []
+        index.update("d", "Ja")
+        index.update("e", "Ja")
+        assert index.groups() == [["c", "d", "e"]]
+        index.remove("a")
+        assert "a" not in index
+
+    def test_similar_entries(self):
+        question = get_entry_by_id(self.state, "itemprefix003")
+        assert [entry.item_id for entry, _ in self.state.similar_entries(
+            question)] == []
+        other = self.state.create_entry("prefix", 3, EntryType.QUESTION)
+        self.state.update_content("Question2\nbla.", other)
+        assert [entry for entry, _ in self.state.similar_entries(
+            question)] == [other]
+        self.state.update_content("Completely different", other)
+        assert self.state.similar_entries(question) == []
+
+    def test_similar_groups(self):
+        first = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        second = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        question = self.state.create_entry("prefix", 3, EntryType.QUESTION)
+        self.state.update_content("Answer1", first)
+        self.state.update_content("Answer1", second)
+        self.state.update_content("Question1", question)
+        groups = self.state.similar_groups(threshold=0.9)
+        assert [[entry.item_id for entry in group] for group in groups] == [
+            ["itemprefix001", "itemprefix010"],
+            ["itemprefix004", "itemprefix008", "itemprefix009"]]
+
+
+class TestGraphQueries(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_reachable(self):
+        question = get_entry_by_id(self.state, "itemprefix001")
+        reachable = {entry.item_id for entry in
+                     self.state.reachable(question)}
+        assert reachable == {"itemprefix001", "itemprefix002",
+                             "itemprefix003", "itemprefix004",
+                             "itemprefix005", "itemprefix006",
+                             "itemprefix007"}
+
+    def test_reachable_backward(self):
+        answer = get_entry_by_id(self.state, "itemprefix006")
+        reaching = {entry.item_id for entry in
+                    self.state.reachable(answer, backward=True)}
+        assert "itemprefix003" in reaching
+        assert "itemprefix006" not in reaching
+
+    def test_shortest_path(self):
+        path = self.state.shortest_path(
+            get_entry_by_id(self.state, "itemprefix002"),
+            get_entry_by_id(self.state, "itemprefix007"))
+        assert [entry.item_id for entry in path] == [
+            "itemprefix002", "itemprefix005", "itemprefix007"]
+
+    def test_cache_invalidated(self):
+        answer = self.state.create_entry("prefix", 3, EntryType.ANSWER)
+        assert self.state.is_orphaned(answer)
+        # itemprefix007
+        self.state.set_entry(3, EntryType.QUESTION)
+        assert self.state.reachable() == []
+        self.state.add_next_entry(answer.entry_id)
+        assert self.state.reachable() == [answer]
+        assert not self.state.is_orphaned(answer)
+        self.state.remove_next_entry([0])
+        assert self.state.reachable() == []
+        assert self.state.is_orphaned(answer)
+
+    def test_depth(self):
+        # Every question is a next entry of an answer
+        assert self.state.depth(
+            get_entry_by_id(self.state, "itemprefix001")) is None
+        question = self.state.create_entry("prefix", 3, EntryType.QUESTION)
+        self.state.selected_entry = question
+        self.state.add_next_entry("prefix002")
+        assert self.state.depth(question) == 0
+        assert self.state.depth(
+            get_entry_by_id(self.state, "itemprefix007")) == 2
+
+    def test_extract_subgraph(self):
+        path = "resources/hints_test_extracted.yml"
+        self.state.set_entry(3, EntryType.QUESTION)
+        self.state.extract_subgraph(path=path)
+        extracted = State(path=path)
+        extracted.load_from_file()
+        assert_num_entries(extracted, 1, 0)
+        Path(path).unlink()
+
+    def test_extract_subgraph_indexed(self):
+        self.state.set_entry(0, EntryType.QUESTION)
+        extracted = self.state.extract_subgraph()
+        assert_num_entries(extracted, 4, 3)
+        assert sum(len(ids) for ids in extracted.ids.values()) == 7
+        assert len(extracted.find_uses("Test")) > 0
+        assert [entry.item_id for entry in extracted.find_uses("Test")] == [
+            entry.item_id for entry in self.state.find_uses("Test")]
+
+
+class TestServer(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+        self.server = StateServer(state, port=0).start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def request(self, requests):
+        with socket.create_connection(("127.0.0.1", self.server.port)) as \
+                connection:
+            for request in requests:
+                connection.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            stream = connection.makefile("rb")
+            responses = []
+            while len(responses) < len(requests):
+                self.server.process_pending(timeout=1)
+                responses.append(json.loads(stream.readline()))
+            return responses
+
+    def test_batch(self):
+        responses = self.request([[
+            {"jsonrpc": "2.0", "id": 1, "method": "create",
+             "params": {"type": "answer", "prefix": "prefix", "length": 3}},
+            {"jsonrpc": "2.0", "id": 2, "method": "link",
+             "params": ["question", "prefix004", "prefix005"]},
+            {"jsonrpc": "2.0", "id": 3, "method": "edit",
+             "params": ["answer", "prefix005", "Answer5"]}]])
+        assert [response["id"] for response in responses[0]] == [1, 2, 3]
+        assert responses[0][1]["result"]["next"] == ["prefix005"]
+        assert_num_entries(self.state, 4, 4)
+        self.state.set_entry(3, EntryType.QUESTION)
+        assert self.state.reachable()[0].content == "Answer5"
+
+    def test_errors(self):
+        responses = self.request([
+            {"jsonrpc": "2.0", "id": 1, "method": "unknown"},
+            {"jsonrpc": "2.0", "id": 2, "method": "get",
+             "params": ["question", "missing"]},
+            {"jsonrpc": "2.0", "id": 3, "method": "save",
+             "params": ["resources/hints_test_server.yml"]}])
+        assert responses[0]["error"]["code"] == -32601
+        assert responses[1]["error"]["code"] == -32602
+        # Only the opened file can be written by other processes
+        assert responses[2]["error"]["code"] == -32602
+        assert not Path("resources/hints_test_server.yml").exists()
+
+    def test_internal_error(self):
+        self.state.path = Path("resources")
+        responses = self.request([[
+            {"jsonrpc": "2.0", "id": 1, "method": "save"},
+            {"jsonrpc": "2.0", "id": 2, "method": "stats"}]])
+        assert responses[0][0]["error"]["code"] == -32603
+        assert "result" in responses[0][1]
+
+    def test_selection_kept(self):
+        self.state.set_entry(0, EntryType.QUESTION)
+        selected = self.state.selected_entry
+        self.request([{"jsonrpc": "2.0", "id": 1, "method": "remove",
+                       "params": ["answer", "prefix003"]}])
+        assert self.state.selected_entry is selected
+        assert_num_entries(self.state, 4, 2)
+
+
+class TestImport(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_import_rows(self):
+        entries, errors = import_rows(self.state, [
+            (2, {"type": "question", "content": "Question5", "next": "#3"}),
+            (3, {"type": "answer", "content": "Ja",
+                 "next": "prefix001; prefix009"}),
+            (4, {"type": "Answer", "id": "prefix009", "content": "Nein"})],
+                                      prefix="prefix", prefix_length=3)
+        assert errors == []
+        assert [(entry.item_id, entry.entry_id) for entry in entries] == [
+            ("itemprefix008", "prefix010"), ("itemprefix009", "prefix011"),
+            ("itemprefix010", "prefix009")]
+        assert entries[0].next_entries == ["prefix011"]
+        assert entries[1].next_entries == ["prefix001", "prefix009"]
+        assert_num_entries(self.state, 5, 5)
+
+    def test_import_errors(self):
+        entries, errors = import_rows(self.state, [
+            (2, {"type": "hint", "content": "Unknown"}),
+            (3, {"type": "question", "next": "prefix001 prefix002"}),
+            (4, {"type": "answer", "id": "prefix001"}),
+            (5, {"type": "answer", "next": "#9"}),
+            (6, {"type": "answer", "next": "#5"}),
+            (7, {"type": "question", "next": "#6"}),
+            (8, {"type": "question", "content": "Valid"})])
+        assert [error.row for error in errors] == [2, 3, 4, 5, 6, 7]
+        assert [entry.content for entry in entries] == ["Valid"]
+
+    def test_import_file(self):
+        path = "resources/hints_import.tsv"
+        with Path(path).open("w", encoding="utf-8") as file:
+            file.write("Type\tID\tContent\tNext\n"
+                       "question\t\tNew question\t#3\n"
+                       "answer\t\t\"Multi\nline\"\tprefix001\n")
+        entries, errors = import_file(self.state, path, "prefix", 3)
+        Path(path).unlink()
+        assert errors == []
+        assert entries[1].content == "Multi\nline"
+        assert entries[0].next_entries == [entries[1].entry_id]
+
+
+class TestDiff(unittest.TestCase):
+    def setUp(self):
+        self.path = "resources/hints_test_changed.yml"
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        # itemprefix005
+        state.set_entry(1, EntryType.ANSWER)
+        state.swap_next(0, 1)
+        # itemprefix001
+        state.set_entry(0, EntryType.QUESTION)
+        state.selected_entry.content = "Changed"
+        # itemprefix006
+        state.set_entry(2, EntryType.ANSWER)
+        state.remove_entry()
+        state.create_entry("prefix", 3, EntryType.QUESTION)
+        state.save_to_file(path=self.path)
+        self.changed = state
+
+    def tearDown(self):
+        Path(self.path).unlink()
+
+    def test_diff(self):
+        changes = diff("resources/hints_test.yml", self.path)
+        change_types = {(change.item_id, change.change_type) for change in
+                        changes}
+        assert change_types == {
+            ("itemprefix001", ChangeType.MODIFIED),
+            ("itemprefix003", ChangeType.RELINKED),
+            ("itemprefix005", ChangeType.REORDERED),
+            ("itemprefix006", ChangeType.REMOVED),
+            ("itemprefix008", ChangeType.ADDED)}
+
+    def test_merge_sorted(self):
+        old = list(iter_entries("resources/hints_test.yml"))
+        new = list(iter_entries(self.path))
+        merged = merge_entries(old, new)
+        assert [(change.item_id, change.change_type) for change in merged] \
+            == sorted((change.item_id, change.change_type) for change in
+                      diff_entries(old, new))
+        with self.assertRaises(NotSortedError):
+            merge_entries(old, list(reversed(new)))
+
+    def test_diff_identical(self):
+        assert diff("resources/hints_test.yml",
+                    "resources/hints_test.yml") == []
+
+    def test_patch(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        patch(state, diff("resources/hints_test.yml", self.path))
+        assert sorted(state._serialize_format()) == sorted(
+            self.changed._serialize_format())
+
+    def test_patch_moved_ids(self):
+        for old_ids, new_ids in [({"item1": "X"}, {"item1": "Y", "item2": "X"}),
+                                 ({"item1": "X", "item2": "Y"},
+                                  {"item1": "Y", "item2": "X"})]:
+            state = State()
+            state.add_loaded_entries(
+                [Answer(item_id, entry_id) for item_id, entry_id in
+                 old_ids.items()])
+            patch(state, diff_entries(
+                [Answer(item_id, entry_id) for item_id, entry_id in
+                 old_ids.items()],
+                [Answer(item_id, entry_id) for item_id, entry_id in
+                 new_ids.items()]))
+            mapping = state.entries[EntryType.ANSWER].entry_mapping
+            assert sorted(state.entries[EntryType.ANSWER].order) == sorted(
+                new_ids.values())
+            assert {entry.item_id: entry_id for entry_id, entry in
+                    mapping.items()} == new_ids
+
+    def test_patch_reused_id(self):
+        state = State()
+        state.add_loaded_entries([Answer("item1", "X")])
+        with self.assertRaises(ValueError):
+            patch(state, diff_entries([Answer("item1", "X")],
+                                      [Answer("item1", "X"),
+                                       Answer("item2", "X")]))
+        assert state.entries[EntryType.ANSWER].order == ["X"]
+
+    def test_patch_missing_target(self):
+        state = State()
+        state.add_loaded_entries([Answer("item1", "X"), Answer("item2", "Y")])
+        changes = diff_entries([Answer("item1", "X"), Answer("item3", "Z")],
+                               [Answer("item3", "Z", ["X"])])
+        with self.assertRaises(ValueError):
+            patch(state, changes)
+        assert state.entries[EntryType.ANSWER].order == ["X", "Y"]
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+
+    def test_compile(self):
+        artifact = compile_state(self.state)[""]
+        strings = artifact["strings"]
+        assert len(artifact["types"]) == 7
+        assert artifact["types"].count(0) == 4
+        # itemprefix005 answers with the questions at index 0, 2 and 3
+        index = [strings[i] for i in artifact["item_ids"]].index(
+            "itemprefix005")
+        start, end = artifact["offsets"][index], artifact["offsets"][index + 1]
+        assert artifact["targets"][start:end] == [0, 2, 3]
+        assert strings[artifact["contents"][index]] == "Answer2"
+
+    def test_compile_unresolved(self):
+        self.state.set_entry(3, EntryType.QUESTION)
+        self.state.add_next_entry("other001")
+        artifact = compile_state(self.state)[""]
+        assert artifact["offsets"][4] - artifact["offsets"][3] == 1
+        target = artifact["targets"][artifact["offsets"][3]]
+        assert target < 0
+        assert artifact["strings"][-target - 1] == "other001"
+
+    def test_export_binary(self):
+        path = "resources/hints_test.bin"
+        export(self.state, path, binary=True)
+        assert load_artifact(path) == compile_state(self.state)[""]
+        Path(path).unlink()
+
+    def test_export_json_sharded(self):
+        self.state.create_entry("other", 3, EntryType.QUESTION)
+        paths = export(self.state, "resources/hints_test.json",
+                       shard_key=lambda entry: entry.entry_id[:5])
+        assert sorted(path.name for path in paths) == [
+            "hints_test_other.json", "hints_test_prefi.json"]
+        for path in paths:
+            load_artifact(path)
+            path.unlink()
+
+
+class TestWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.root = Path("resources/workspace")
+        self.root.mkdir()
+        shutil.copy("resources/hints_test.yml", str(self.root / "main.yml"))
+        (self.root / "other").mkdir()
+        (self.root / "other" / "other.yml").write_text(
+            "- itemother001:\n"
+            "    question_id: other001\n"
+            "    following_answer_id: prefix001\n"
+            "    content: |\n"
+            "      Frage mit Umlauten äöü\n"
+            "- itemother002:\n"
+            "    answer_id: other001\n"
+            "    question_options: [ ]\n"
+            "    content: |\n"
+            "      Antwort\n", encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.root))
+
+    def test_index(self):
+        workspace = open_workspace(self.root, processes=1)
+        assert len(workspace) == 9
+        location = workspace.find(EntryType.ANSWER, "other001")[0]
+        assert location.item_id == "itemother002"
+        assert workspace.read_entry(location).content == "Antwort"
+        assert len(workspace.find(EntryType.ANSWER, "prefix001")) == 1
+
+    def test_refresh_incremental(self):
+        open_workspace(self.root, processes=2)
+        workspace = WorkspaceIndex(self.root).load()
+        assert len(workspace) == 9
+        assert workspace.refresh() == ([], [])
+        (self.root / "main.yml").unlink()
+        assert workspace.refresh() == ([], ["main.yml"])
+        assert workspace.find(EntryType.ANSWER, "prefix001") == []
+
+    def test_resolve_next(self):
+        state = State(path=str(self.root / "main.yml"))
+        state.load_from_file()
+        state.set_workspace(open_workspace(self.root, processes=1))
+        state.set_entry(3, EntryType.QUESTION)
+        state.add_next_entry("other001")
+        index, location = state.get_next()[0]
+        assert index == -1
+        assert location.path.name == "other.yml"
+        assert state.complete_id("other") == ["other001"]
+        entry = state.open_location(location)
+        assert entry.item_id == "itemother002"
+        assert state.workspace is not None
+
+    def test_open_location_unsaved(self):
+        workspace = open_workspace(self.root, processes=1)
+        location = workspace.find(EntryType.ANSWER, "other001")[0]
+        for auto_save in (True, False):
+            state = State(path=str(self.root / "main.yml"),
+                          auto_save=auto_save)
+            state.load_from_file()
+            assert not state.has_unsaved_changes()
+            state.update_content("Changed {}".format(auto_save),
+                                 state.entries[EntryType.QUESTION].
+                                 get_object_by_index(0))
+            assert state.has_unsaved_changes()
+            state.open_location(location)
+            assert not state.has_unsaved_changes()
+        state = State(path=str(self.root / "main.yml"))
+        state.load_from_file()
+        assert state.entries[EntryType.QUESTION].get_object_by_index(
+            0).content == "Changed True"
+
+
+class TestSession(unittest.TestCase):
+    def setUp(self):
+        state = State(path="resources/hints_test.yml")
+        state.load_from_file()
+        self.state = state
+        self.records = [
+            {"event": "answer_list",
+             "elements": {"answer_list": {"indexes": [1]}}},
+            {"event": "textbox", "elements": {"textbox": {"value": "New"}}},
+            {"event": "other_id",
+             "elements": {"other_id": {"value": "prefix00"}}},
+            {"event": "item_add",
+             "elements": {"other_id": {"value": "prefix002"}}},
+            {"event": "Save    Ctrl+s", "elements": {}},
+            {"event": "add_question", "elements": {}},
+            {"event": None, "elements": {}}]
+
+    def test_replay(self):
+        window = replay(self.state, self.records)
+        assert [timing.event for timing in window.timings] == [
+            "answer_list", "textbox", "other_id", "item_add", "add_question"]
+        assert window.skipped == ["Save    Ctrl+s"]
+        answer = get_entry_by_id(self.state, "itemprefix005")
+        assert answer.content == "New"
+        assert answer.next_entries[-1] == "prefix002"
+        assert_num_entries(self.state, 5, 3)
+        selection = window.timings[0]
+        assert selection.calls[("answer_list", "update")] == 1
+        assert selection.items >= 7
+        assert window["id_suggestions"].values == ["prefix001", "prefix002",
+                                                   "prefix003", "prefix004"]
+
+    def test_record(self):
+        path = "resources/trace.jsonl"
+        recorder = SessionRecorder(FakeWindow(self.records), path,
+                                   self.state.path)
+        event_loop(self.state, recorder)
+        recorder.close()
+        hints_path, records = read_trace(path)
+        assert hints_path == str(self.state.path)
+        assert [record["event"] for record in records] == [
+            "answer_list", "textbox", "other_id", "item_add", "add_question",
+            None]
+        assert records[0]["elements"]["answer_list"] == {"indexes": [1]}
+        assert records[3]["elements"] == {"other_id": {"value": "prefix002"}}
+        Path(path).unlink()
+
+
 def get_entry_by_id(state, item_id):
     combined = state.get_content(EntryType.QUESTION) + state.get_content(
         EntryType.ANSWER)